@@ -30,6 +30,9 @@ class Config:
     # Application Settings
     DEBUG: bool = os.getenv('DEBUG', 'false').lower() == 'true'
     MAX_FILE_SIZE_MB: int = int(os.getenv('MAX_FILE_SIZE_MB', '50'))
+    # Keep a local JSON copy of every parse result alongside the database record
+    WRITE_LOCAL_JSON: bool = os.getenv('PDF2DATA_WRITE_LOCAL_JSON', 'true').lower() == 'true'
+    EXTRACTION_WORKERS: int = int(os.getenv('EXTRACTION_WORKERS', str(os.cpu_count() or 1)))
     
     @classmethod
     def validate_openai_config(cls) -> bool:
@@ -1,12 +1,28 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from gridfs.errors import NoFile
+import asyncio
 import os
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, BinaryIO
 import logging
 
 # MongoDB connection
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGO_URI)
+
+# Single client shared by the whole process; Motor binds it to the event loop
+# on first use, so it must never be recreated per request or used from threads
+client = AsyncIOMotorClient(
+    MONGO_URI,
+    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+    minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "10")),
+    waitQueueTimeoutMS=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+    # Fail requests quickly when MongoDB is unreachable or stalls instead of
+    # letting them hang on the driver's 30 s defaults (or forever on a socket read)
+    serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")),
+    connectTimeoutMS=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "2000")),
+    socketTimeoutMS=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "15000")),
+    retryReads=True
+)
 db = client["pdf_parser_db"]
 
 # Collections for different data types
@@ -18,6 +34,21 @@ processing_logs_collection = db["processing_logs"] # All processing logs
 # GridFS bucket for large file storage (PDFs)
 gridfs_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="pdf_files")
 
+# GridFS bucket for cached page preview images, named "<gridfs_file_id>_<page>_<dpi>"
+previews_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="page_previews")
+
+# GridFS bucket for Excel exports too large to cache on the parsed document,
+# named "<file_id>_<version>.xlsx"
+exports_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="excel_exports")
+
+# GridFS bucket for extracted text, named "<file_id>_<mode>.txt"; keeps large
+# OCR output out of extraction records and clear of the 16 MB document limit
+texts_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="extracted_texts")
+
+# Extracted text up to this many UTF-8 bytes stays inline on the extraction
+# record; anything larger goes to texts_bucket
+TEXT_INLINE_LIMIT = int(os.getenv("TEXT_INLINE_LIMIT", str(1_000_000)))
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -25,11 +56,11 @@ class DocumentManager:
     """Handles all document-related database operations"""
     
     @staticmethod
-    async def create_document(file_id: str, original_filename: str, file_content: bytes, additional_metadata: Dict = None) -> Dict[str, Any]:
-        """Create a new document record and store PDF in GridFS"""
+    async def create_document(file_id: str, original_filename: str, file_stream: BinaryIO, file_size: int, additional_metadata: Dict = None) -> Dict[str, Any]:
+        """Create a new document record and store PDF in GridFS, reading it from file_stream in chunks"""
         try:
             print(f"🔵 DocumentManager: Starting create_document for {file_id}")
-            print(f"🔵 DocumentManager: Filename: {original_filename}, Size: {len(file_content)} bytes")
+            print(f"🔵 DocumentManager: Filename: {original_filename}, Size: {file_size} bytes")
             
             print(f"🔵 DocumentManager: Opening GridFS upload stream...")
             # Store PDF in GridFS
@@ -45,7 +76,9 @@ class DocumentManager:
             print(f"✅ DocumentManager: GridFS upload stream opened")
             
             print(f"🔵 DocumentManager: Writing content to GridFS...")
-            await grid_in.write(file_content)
+            # GridIn reads file objects a chunk at a time, so the PDF is never held whole in memory
+            file_stream.seek(0)
+            await grid_in.write(file_stream)
             print(f"✅ DocumentManager: Content written to GridFS")
             
             print(f"🔵 DocumentManager: Closing GridFS stream...")
@@ -60,7 +93,7 @@ class DocumentManager:
                 "gridfs_file_id": grid_in._id,
                 "status": "uploaded",
                 "uploaded_at": datetime.utcnow(),
-                "file_size": len(file_content),
+                "file_size": file_size,
                 "processing_stages": {
                     "uploaded": True,
                     "extracted": False,
@@ -83,7 +116,7 @@ class DocumentManager:
                 "file_id": file_id,
                 "original_filename": original_filename,
                 "gridfs_file_id": str(grid_in._id),
-                "file_size": len(file_content)
+                "file_size": file_size
             }
             print(f"🎉 DocumentManager: create_document completed successfully for {file_id}")
             return result
@@ -143,21 +176,47 @@ class ExtractionManager:
             "file_id": file_id,
             "extraction_mode": mode,
             "method_used": method,
-            "extracted_text": extracted_text,
             "num_pages": num_pages,
             "num_chars": num_chars,
             "extracted_at": datetime.utcnow(),
             "status": "completed"
         }
         
+        # Small texts are kept inline so reading them back costs no extra round-trip;
+        # large ones go to GridFS and the record only references them
+        text_name = f"{file_id}_{mode}.txt"
+        text_bytes = extracted_text.encode("utf-8")
+        text_gridfs_id = None
+        if len(text_bytes) > TEXT_INLINE_LIMIT:
+            text_gridfs_id = await texts_bucket.upload_from_stream(
+                text_name,
+                text_bytes,
+                metadata={"file_id": file_id, "mode": mode}
+            )
+            extraction_record["text_gridfs_id"] = text_gridfs_id
+        else:
+            extraction_record["extracted_text"] = extracted_text
+        
         await extractions_collection.replace_one(
             {"_id": f"{file_id}_{mode}"},
             extraction_record,
             upsert=True
         )
         
-        # Update document processing stage
-        await DocumentManager.update_processing_stage(file_id, "extracted", True)
+        # Drop text from earlier extractions in this mode now that nothing references it
+        async for previous_text in texts_bucket.find({"filename": text_name, "_id": {"$ne": text_gridfs_id}}):
+            await texts_bucket.delete(previous_text._id)
+        
+        # Update document processing stage, and record the page count so readers
+        # never have to open the PDF again to find it
+        document_update = {
+            "processing_stages.extracted": True,
+            "last_updated": datetime.utcnow()
+        }
+        if num_pages:
+            document_update["page_count"] = num_pages
+        
+        await documents_collection.update_one({"_id": file_id}, {"$set": document_update})
         
         logger.info(f"Extraction {file_id}_{mode} stored successfully")
         return extraction_record
@@ -167,20 +226,48 @@ class ExtractionManager:
         """Get extracted text, trying preferred mode first, then any available"""
         if preferred_mode:
             extraction = await extractions_collection.find_one({"_id": f"{file_id}_{preferred_mode}"})
+            if extraction:
+                extraction = await ExtractionManager.load_text(extraction)
             if extraction:
                 return extraction
         
-        # Try all modes in order of preference
+        # Try all modes in order of preference; a record whose text is missing counts as absent
         for mode in ["digital", "ocr", "auto"]:
             extraction = await extractions_collection.find_one({"_id": f"{file_id}_{mode}"})
+            if extraction:
+                extraction = await ExtractionManager.load_text(extraction)
             if extraction:
                 return extraction
         
         return None
+    
+    @staticmethod
+    async def load_text(extraction: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Fill in extracted_text from GridFS for records whose text was too large to keep inline.
+        Returns None if that text is missing, as for a record that was never stored.
+        """
+        if "extracted_text" not in extraction and "text_gridfs_id" in extraction:
+            try:
+                text_file = await texts_bucket.open_download_stream(extraction["text_gridfs_id"])
+            except NoFile:
+                logger.warning(f"Extracted text {extraction['text_gridfs_id']} of {extraction['_id']} is missing from GridFS")
+                return None
+            extraction["extracted_text"] = (await text_file.read()).decode("utf-8")
+        return extraction
 
 class LogManager:
     """Handles all processing logs"""
     
+    # While the app is running, log records are queued and a background task
+    # writes them in batches, so request handlers never wait on the insert
+    LOG_BATCH_SIZE = 128
+    _queue: Optional[asyncio.Queue] = None
+    _writer: Optional[asyncio.Task] = None
+    # Queued-but-unwritten log counts per file_id, and events for callers waiting on them
+    _pending: Dict[str, int] = {}
+    _flushed: Dict[str, asyncio.Event] = {}
+    
     @staticmethod
     async def store_log(file_id: str, process_type: str, log_content: str, metadata: Dict = None):
         """Store processing logs"""
@@ -192,7 +279,70 @@ class LogManager:
             "logged_at": datetime.utcnow()
         }
         
-        await processing_logs_collection.insert_one(log_record)
+        if LogManager._writer is None:
+            # No background writer (e.g. scripts outside the app); insert directly
+            await processing_logs_collection.insert_one(log_record)
+        else:
+            LogManager._pending[file_id] = LogManager._pending.get(file_id, 0) + 1
+            LogManager._queue.put_nowait(log_record)
+    
+    @staticmethod
+    def start_writer():
+        """Start the background task that writes queued logs; call once the event loop is running"""
+        LogManager._queue = asyncio.Queue()
+        LogManager._writer = asyncio.create_task(LogManager._write_batches(LogManager._queue))
+    
+    @staticmethod
+    async def stop_writer(timeout: float = 5.0):
+        """Flush queued logs and stop the background writer"""
+        writer, queue = LogManager._writer, LogManager._queue
+        if writer is None:
+            return
+        LogManager._writer = None
+        try:
+            await asyncio.wait_for(queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropped {queue.qsize()} queued logs on shutdown")
+        writer.cancel()
+        LogManager._pending.clear()
+        for flushed in LogManager._flushed.values():
+            flushed.set()
+        LogManager._flushed.clear()
+    
+    @staticmethod
+    async def flush(file_id: str, timeout: float = 5.0):
+        """Wait until the logs queued for file_id are written, so a delete that follows removes them too"""
+        if not LogManager._pending.get(file_id):
+            return
+        flushed = LogManager._flushed.setdefault(file_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(flushed.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out waiting for queued logs of {file_id} to be written")
+    
+    @staticmethod
+    def _mark_written(file_id: str):
+        remaining = LogManager._pending.pop(file_id, 0) - 1
+        if remaining > 0:
+            LogManager._pending[file_id] = remaining
+        elif file_id in LogManager._flushed:
+            LogManager._flushed.pop(file_id).set()
+    
+    @staticmethod
+    async def _write_batches(queue: asyncio.Queue):
+        """Write queued logs with one insert_many per batch; logs queued while an insert is in flight form the next batch"""
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < LogManager.LOG_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await processing_logs_collection.insert_many(batch, ordered=False)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} processing logs: {str(e)}")
+            finally:
+                for log_record in batch:
+                    LogManager._mark_written(log_record["file_id"])
+                    queue.task_done()
     
     @staticmethod
     async def get_logs(file_id: str, process_type: str = None):
@@ -210,6 +360,12 @@ async def init_database():
     # Documents collection indexes
     await documents_collection.create_index("uploaded_at")
     await documents_collection.create_index("status")
+    # Serves both the orphan scan (uploaded + parsed) and the workflow-stage counts
+    await documents_collection.create_index([
+        ("processing_stages.uploaded", 1),
+        ("processing_stages.parsed", 1),
+        ("processing_stages.extracted", 1)
+    ])
     
     # Extractions collection indexes  
     await extractions_collection.create_index("file_id")
@@ -219,9 +375,13 @@ async def init_database():
     # Parsed documents indexes (existing)
     await parsed_collection.create_index("uploaded_at")
     await parsed_collection.create_index("parser")
+    await parsed_collection.create_index("tables.success")
+    await parsed_collection.create_index([("saved", 1), ("saved_at", -1)])
     
     # Processing logs indexes
-    await processing_logs_collection.create_index([("file_id", 1), ("process_type", 1)])
+    # Log lookups filter by file (and optionally process type) and sort by time, then _id
+    await processing_logs_collection.create_index([("file_id", 1), ("logged_at", 1), ("_id", 1)])
+    await processing_logs_collection.create_index([("file_id", 1), ("process_type", 1), ("logged_at", 1), ("_id", 1)])
     await processing_logs_collection.create_index("logged_at")
     
     logger.info("Database indexes initialized successfully")
@@ -28,7 +28,9 @@ def run_extraction(
         log(f"Opening PDF file: {os.path.basename(pdf_path)}")
         time.sleep(0.3)
         
-        output_text = ""
+        # Page texts are collected and joined once at the end; growing a single
+        # string page by page re-copies everything extracted so far on each page
+        page_texts = []
         method_used = mode
         num_pages = 0
 
@@ -45,13 +47,13 @@ def run_extraction(
                     log(f"Processing page {i + 1}/{num_pages}...")
                     text = page.extract_text()
                     if text:
-                        output_text += f"\n--- Page {i + 1} ---\n{text}"
+                        page_texts.append(f"\n--- Page {i + 1} ---\n{text}")
                         log(f"✓ Extracted {len(text)} characters from page {i + 1}")
                     else:
                         log(f"⚠ Page {i + 1} contains no extractable text")
                     time.sleep(0.1)
                     
-            if not output_text.strip():
+            if not any(page_text.strip() for page_text in page_texts):
                 log("✗ Digital extraction failed - no text found")
                 raise ValueError("Digital extraction failed (empty)")
             else:
@@ -70,7 +72,7 @@ def run_extraction(
             for i, image in enumerate(images):
                 log(f"Running OCR on page {i + 1}/{num_pages}...")
                 text = pytesseract.image_to_string(image, lang=ocr_lang)
-                output_text += f"\n--- Page {i + 1} ---\n{text}"
+                page_texts.append(f"\n--- Page {i + 1} ---\n{text}")
                 log(f"✓ OCR completed for page {i + 1} - {len(text)} characters extracted")
                 
                 # Force cleanup of image from memory after processing
@@ -109,17 +111,18 @@ def run_extraction(
         
         log(f"Writing extracted content to: {filename}")
         with open(output_path, "w", encoding="utf-8") as f:
-            f.write(output_text)
+            f.writelines(page_texts)
         time.sleep(0.2)
         
+        num_chars = sum(len(page_text) for page_text in page_texts)
         log("✓ Text extraction file saved successfully")
-        log(f"✓ Total characters extracted: {len(output_text)}")
+        log(f"✓ Total characters extracted: {num_chars}")
         log("✓ Extraction process completed")
 
         return {
             "output_path": str(output_path),
             "num_pages": num_pages,
-            "num_chars": len(output_text),
+            "num_chars": num_chars,
             "method": mode
         }
         
@@ -150,7 +153,9 @@ def run_extraction_from_content(
         log(f"Opening PDF file: {os.path.basename(pdf_path)}")
         time.sleep(0.3)
         
-        output_text = ""
+        # Page texts are collected and joined once at the end; growing a single
+        # string page by page re-copies everything extracted so far on each page
+        page_texts = []
         method_used = mode
         num_pages = 0
 
@@ -167,13 +172,13 @@ def run_extraction_from_content(
                     log(f"Processing page {i + 1}/{num_pages}...")
                     text = page.extract_text()
                     if text:
-                        output_text += f"\n--- Page {i + 1} ---\n{text}"
+                        page_texts.append(f"\n--- Page {i + 1} ---\n{text}")
                         log(f"✓ Extracted {len(text)} characters from page {i + 1}")
                     else:
                         log(f"⚠ Page {i + 1} contains no extractable text")
                     time.sleep(0.1)
                     
-            if not output_text.strip():
+            if not any(page_text.strip() for page_text in page_texts):
                 log("✗ Digital extraction failed - no text found")
                 raise ValueError("Digital extraction failed (empty)")
             else:
@@ -192,7 +197,7 @@ def run_extraction_from_content(
             for i, image in enumerate(images):
                 log(f"Running OCR on page {i + 1}/{num_pages}...")
                 text = pytesseract.image_to_string(image, lang="eng")
-                output_text += f"\n--- Page {i + 1} ---\n{text}"
+                page_texts.append(f"\n--- Page {i + 1} ---\n{text}")
                 log(f"✓ OCR completed for page {i + 1} - {len(text)} characters extracted")
                 
                 # Force cleanup of image from memory after processing
@@ -224,6 +229,9 @@ def run_extraction_from_content(
             log(f"✗ Invalid extraction mode: {mode}")
             raise ValueError("Invalid extraction mode")
 
+        output_text = "".join(page_texts)
+        del page_texts
+        
         log("✓ Text extraction completed successfully")
         log(f"✓ Total characters extracted: {len(output_text)}")
         log("✓ Extraction process completed")
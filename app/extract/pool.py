@@ -0,0 +1,160 @@
+import itertools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+from app.config import config
+from app.extract.extractor import run_extraction_from_content
+from app.utils.memory_monitor import MemoryMonitor, force_cleanup
+
+logger = logging.getLogger(__name__)
+
+# Worker processes are spawned rather than forked so they never inherit the
+# server's event loop, MongoDB client or executor threads
+_mp_context = multiprocessing.get_context("spawn")
+
+_extraction_executor: Optional[ProcessPoolExecutor] = None
+
+# Log messages from every worker travel over one manager queue as
+# (stream_id, message) pairs; a single relay thread hands each one to the
+# stream that registered that id. A None message ends a stream.
+_log_manager = None
+_log_queue = None
+_relay_thread: Optional[threading.Thread] = None
+_relay_targets: Dict[int, Callable[[Optional[str]], None]] = {}
+_relay_lock = threading.Lock()
+_stream_ids = itertools.count()
+
+def _init_worker():
+    """Configure logging in each worker so memory warnings reach the server log"""
+    logging.basicConfig(level=logging.INFO)
+
+def run_monitored_extraction(pdf_path: str, file_id: str, mode: str, log_callback=None) -> dict:
+    """Worker entry point: run the extraction with memory monitoring and cleanup in the worker itself"""
+    with MemoryMonitor(f"extraction_{mode}_{file_id}"):
+        result = run_extraction_from_content(pdf_path, file_id, mode, log_callback=log_callback)
+    force_cleanup()
+    return result
+
+def get_extraction_executor() -> ProcessPoolExecutor:
+    """
+    Shared pool of extraction worker processes, started on first use.
+
+    Extraction is CPU-bound, so it runs in separate processes instead of one
+    thread per request; the pool size caps how many extractions run at once
+    and further requests wait for a free worker.
+    """
+    global _extraction_executor
+    if _extraction_executor is None:
+        _extraction_executor = ProcessPoolExecutor(
+            max_workers=config.EXTRACTION_WORKERS,
+            mp_context=_mp_context,
+            initializer=_init_worker
+        )
+        logger.info(f"Started extraction pool with {config.EXTRACTION_WORKERS} workers")
+    return _extraction_executor
+
+def submit_extraction(fn, *args, **kwargs) -> Future:
+    """
+    Submit a job to the extraction pool.
+
+    If a worker died (e.g. killed for running out of memory), the pool refuses
+    all further work; it is then replaced with a fresh one and the job is
+    submitted again.
+    """
+    global _extraction_executor
+    executor = get_extraction_executor()
+    try:
+        return executor.submit(fn, *args, **kwargs)
+    except BrokenProcessPool:
+        logger.warning("Extraction pool is broken after a worker died; starting a new one")
+        executor.shutdown(wait=False, cancel_futures=True)
+        if _extraction_executor is executor:
+            _extraction_executor = None
+        return get_extraction_executor().submit(fn, *args, **kwargs)
+
+class StreamLogger:
+    """Picklable log callback that tags a worker's messages with the stream they belong to"""
+
+    def __init__(self, queue, stream_id: int):
+        self.queue = queue
+        self.stream_id = stream_id
+
+    def __call__(self, message: str):
+        self.queue.put((self.stream_id, message))
+
+    def close(self):
+        """Mark the end of the stream; blocking, so run it via asyncio.to_thread"""
+        self.queue.put((self.stream_id, None))
+
+    def discard(self):
+        """Stop relaying this stream without waiting for its end marker"""
+        _relay_targets.pop(self.stream_id, None)
+
+def _relay_logs(log_queue):
+    while True:
+        try:
+            item = log_queue.get()
+        except Exception as e:
+            # The manager is gone; the next register_log_stream starts a new relay
+            logger.error(f"Extraction log relay stopped, its queue failed: {str(e)}")
+            return
+        if item is None:
+            return
+
+        # One bad message or stream must not stop the relay for every other stream
+        try:
+            stream_id, message = item
+            deliver = _relay_targets.pop(stream_id, None) if message is None else _relay_targets.get(stream_id)
+            if deliver is not None:
+                deliver(message)
+        except Exception as e:
+            logger.error(f"Error relaying extraction log message: {str(e)}")
+
+def register_log_stream(deliver: Callable[[Optional[str]], None]) -> StreamLogger:
+    """
+    Register a log stream and return the callback workers should log through.
+
+    deliver is called on the relay thread with each message, then with None once
+    StreamLogger.close() has been called. Plain multiprocessing queues cannot be
+    passed to pool workers, so the queue lives in a manager process; the first
+    call starts it, so run this via asyncio.to_thread.
+    """
+    global _log_manager, _log_queue, _relay_thread
+    with _relay_lock:
+        if _relay_thread is None or not _relay_thread.is_alive():
+            if _log_manager is not None:
+                # The previous relay died; streams still registered with it time out
+                logger.warning("Restarting the extraction log relay")
+                _relay_targets.clear()
+                try:
+                    _log_manager.shutdown()
+                except Exception:
+                    pass
+            _log_manager = _mp_context.Manager()
+            _log_queue = _log_manager.Queue()
+            _relay_thread = threading.Thread(target=_relay_logs, args=(_log_queue,), name="extraction-log-relay", daemon=True)
+            _relay_thread.start()
+        stream_id = next(_stream_ids)
+        _relay_targets[stream_id] = deliver
+    return StreamLogger(_log_queue, stream_id)
+
+def shutdown_extraction_pool():
+    """Stop the worker processes, the log relay and its manager, if they were started"""
+    global _extraction_executor, _log_manager, _log_queue, _relay_thread
+    if _extraction_executor is not None:
+        _extraction_executor.shutdown(wait=False, cancel_futures=True)
+        _extraction_executor = None
+    with _relay_lock:
+        if _relay_thread is not None:
+            if _relay_thread.is_alive():
+                _log_queue.put(None)
+                _relay_thread.join(timeout=5)
+            _relay_thread = None
+            _relay_targets.clear()
+        if _log_manager is not None:
+            _log_manager.shutdown()
+            _log_manager = None
+            _log_queue = None
@@ -1,61 +1,282 @@
 from fastapi import APIRouter, HTTPException, Request, Response
-from fastapi.responses import JSONResponse
-import json
-import base64
-import os
+from fastapi.responses import StreamingResponse, RedirectResponse
+import re
 import tempfile
+import orjson
 import asyncio
+import hashlib
+import logging
 from datetime import datetime
-from pdf2image import convert_from_path
-from io import BytesIO
+from typing import Any, Callable, Iterable, NamedTuple
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
 from openpyxl.utils.dataframe import dataframe_to_rows
-from app.db.mongo import parsed_collection, documents_collection, extractions_collection, processing_logs_collection, gridfs_bucket, LogManager, DocumentManager
+from cachetools import TTLCache
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs.errors import NoFile
+from pymongo import ReturnDocument
+from app.db.mongo import parsed_collection, documents_collection, extractions_collection, processing_logs_collection, gridfs_bucket, previews_bucket, exports_bucket, LogManager, DocumentManager
 from app.utils.data_lifecycle import DataLifecycleManager
+from app.utils.orjson_response import ORJSONResponse, ORJSON_OPTIONS
+from app.utils.pdf_pages import count_pages, render_page_png, pdf_executor
+from app.utils.document_cache import list_cache, unite_status_cache, invalidate_document_caches
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+logger = logging.getLogger(__name__)
+
+# Resolution used when rendering page previews; part of the preview cache key
+PREVIEW_DPI = 120
+
+# Sent on responses that are already compressed (xlsx, PDF, PNG) so GZipMiddleware
+# passes them through instead of spending CPU re-compressing them
+IDENTITY_ENCODING = {"Content-Encoding": "identity"}
+
+# Generated workbooks up to this size are cached on the parsed document
+# (well under MongoDB's 16 MB document limit)
+EXCEL_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Characters replaced when building download filenames from uploaded names
+_UNSAFE_FILENAME_CHARS = re.compile(r'[<>:"|?*\\/\s]+')
+
+# Page size bounds for /api/logs
+LOGS_PAGE_SIZE = 100
+MAX_LOGS_PAGE_SIZE = 1000
+
+# Page size bounds for /api/list
+LIST_PAGE_SIZE = 100
+MAX_LIST_PAGE_SIZE = 500
+
+# Maximum number of orphaned documents deleted concurrently during cleanup
+ORPHAN_CLEANUP_CONCURRENCY = 32
+
+# Short-lived cache for dashboard stats endpoints that are polled every few seconds,
+# holding the encoded JSON bodies so a hit is served without re-serializing.
+# Each entry has its own lock, taken only on a miss, so one slow refresh never
+# holds up cache hits or the other endpoint
+_stats_cache = TTLCache(maxsize=8, ttl=3)
+_stats_cache_locks = {"system_stats": asyncio.Lock(), "lifecycle_stats": asyncio.Lock()}
+
+def _facet_count(facet_result: dict, name: str) -> int:
+    """Read the value of a [{"$count": "n"}] sub-pipeline from a $facet result"""
+    bucket = facet_result.get(name) or []
+    return bucket[0]["n"] if bucket else 0
+
+class _Styled(NamedTuple):
+    """A sheet value to be written with one of the workbook's registered named styles"""
+    value: Any
+    style: str
+
+def _write_sheet(ws, make_rows: Callable[[], Iterable[tuple]], max_width: int):
+    """
+    Write rows to a write-only worksheet without holding the sheet in memory.
+
+    make_rows returns a fresh iterator of (values, merge_to_col) pairs, one per
+    row; values are plain values or _Styled, and merge_to_col, if set, merges
+    columns A to that column. Column widths have to be set before the first row
+    of a write-only sheet is written, so a first pass over the raw values works
+    out the widths and a second pass appends each row as it is produced.
+    """
+    widths = {}
+    for values, _ in make_rows():
+        for col_idx, value in enumerate(values, 1):
+            text = value.value if isinstance(value, _Styled) else value
+            if text:
+                widths[col_idx] = max(widths.get(col_idx, 0), len(str(text)))
+    
+    for col_idx, width in widths.items():
+        ws.column_dimensions[get_column_letter(col_idx)].width = min(width + 2, max_width)
+    
+    # Blank rows are only written once a later row needs them, so the sheet
+    # does not end in empty rows
+    pending_blank_rows = 0
+    for row, (values, merge_to_col) in enumerate(make_rows(), 1):
+        if not values:
+            pending_blank_rows += 1
+            continue
+        for _ in range(pending_blank_rows):
+            ws.append(())
+        pending_blank_rows = 0
+        
+        if merge_to_col:
+            ws.merged_cells.add(CellRange(min_col=1, min_row=row, max_col=merge_to_col, max_row=row))
+        ws.append([
+            _styled_cell(ws, value.value, value.style) if isinstance(value, _Styled) else value
+            for value in values
+        ])
+
+def _styled_cell(ws, value, style: str):
+    """Create a WriteOnlyCell using one of the workbook's registered named styles"""
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+def _extraction_info(mode: str, method: str, pages: int, chars: int = 0, extracted_at: datetime = None) -> dict:
+    """Build the extraction_info block of /api/data responses with a fixed key order"""
+    return {
+        "mode": mode,
+        "method": method,
+        "pages": pages,
+        "chars": chars,
+        "extracted_at": extracted_at
+    }
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header lists the given ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def _is_path_safe(key) -> bool:
+    """Whether a key can be used as a segment of a dotted update path"""
+    return isinstance(key, str) and key != "" and "." not in key and not key.startswith("$")
+
+def _diff_paths(old, new, path: str, set_fields: dict, unset_fields: dict):
+    """
+    Collect the minimal $set/$unset paths that turn ``old`` into ``new``.
+
+    Dicts are compared key by key and equal-length lists element by element;
+    anything else that differs is replaced wholesale at ``path``.
+    """
+    if isinstance(old, dict) and isinstance(new, dict) and all(_is_path_safe(k) for k in {**old, **new}):
+        for key in old.keys() - new.keys():
+            unset_fields[f"{path}.{key}"] = ""
+        for key, value in new.items():
+            if key not in old:
+                set_fields[f"{path}.{key}"] = value
+            else:
+                _diff_paths(old[key], value, f"{path}.{key}", set_fields, unset_fields)
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            _diff_paths(old_item, new_item, f"{path}.{index}", set_fields, unset_fields)
+    elif type(old) is not type(new) or old != new:
+        set_fields[path] = new
+
+def _diff_update(old_doc: dict, new_doc: dict):
+    """
+    Build an update document that makes ``old_doc`` equal to ``new_doc``.
+
+    Args:
+        old_doc: Document currently stored (including _id)
+        new_doc: Full replacement document
+
+    Returns:
+        dict: Update with $set/$unset operators, or None if a top-level key can't
+        be expressed as an update path and the document must be replaced instead
+    """
+    if not all(_is_path_safe(key) for key in {**old_doc, **new_doc} if key != "_id"):
+        return None
+    
+    set_fields, unset_fields = {}, {}
+    for key in old_doc.keys() - new_doc.keys():
+        unset_fields[key] = ""
+    for key, value in new_doc.items():
+        if key == "_id":
+            continue
+        if key not in old_doc:
+            set_fields[key] = value
+        else:
+            _diff_paths(old_doc[key], value, key, set_fields, unset_fields)
+    
+    update = {}
+    if set_fields:
+        update["$set"] = set_fields
+    if unset_fields:
+        update["$unset"] = unset_fields
+    return update
 
 @router.get("/api/list")
-async def get_parsed_documents_list():
+async def get_parsed_documents_list(request: Request, skip: int = 0, limit: int = LIST_PAGE_SIZE):
     """Get list of all saved (approved) parsed documents with enhanced metadata"""
-    cursor = parsed_collection.find(
-        {"saved": True},  # Only show saved/approved documents
-        {
-            "_id": 1, 
-            "parser": 1, 
-            "original_filename": 1, 
-            "uploaded_at": 1,
-            "extraction_mode_used": 1,
-            "num_entries": 1,
-            "processing_completed": 1,
-            "saved": 1,
-            "saved_at": 1
-        }
-    )
-    docs = await cursor.to_list(length=100)
+    skip = max(0, skip)
+    limit = max(1, min(limit, MAX_LIST_PAGE_SIZE))
     
-    # Add processing stage information for each document
-    for doc in docs:
-        file_id = doc["_id"]
-        doc_metadata = await documents_collection.find_one({"_id": file_id})
-        if doc_metadata:
-            doc["processing_stages"] = doc_metadata.get("processing_stages", {})
-            doc["file_size"] = doc_metadata.get("file_size")
+    cached = list_cache.get((skip, limit))
+    if cached is None:
+        # Join processing stage information from the documents collection server-side
+        pipeline = [
+            {"$match": {"saved": True}},  # Only show saved/approved documents
+            {"$sort": {"saved_at": -1}},
+            {"$skip": skip},
+            {"$limit": limit},
+            {"$lookup": {
+                "from": documents_collection.name,
+                "localField": "_id",
+                "foreignField": "_id",
+                "as": "metadata"
+            }},
+            {"$project": {
+                "_id": 1, 
+                "parser": 1, 
+                "original_filename": 1, 
+                "uploaded_at": 1,
+                "extraction_mode_used": 1,
+                "num_entries": 1,
+                "processing_completed": 1,
+                "saved": 1,
+                "saved_at": 1,
+                "processing_stages": {"$arrayElemAt": ["$metadata.processing_stages", 0]},
+                "file_size": {"$arrayElemAt": ["$metadata.file_size", 0]}
+            }}
+        ]
+        docs = await parsed_collection.aggregate(pipeline).to_list(length=limit)
+        
+        body = ORJSONResponse({"entries": docs}).body
+        cached = (body, f'"{hashlib.md5(body).hexdigest()}"')
+        list_cache[(skip, limit)] = cached
+    
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
     
-    # Convert datetime objects to strings for JSON serialization
-    serializable_docs = json.loads(json.dumps(docs, default=str))
-    return {"entries": serializable_docs}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/api/data/{file_id}")
-async def get_parsed_data(file_id: str, request: Request):
+async def get_parsed_data(file_id: str, request: Request, fields: str = None):
     """Get parsed data for a specific file with enhanced metadata"""
-    # First try to get parsed data
-    doc = await parsed_collection.find_one({"_id": file_id})
+    # ?fields=a,b limits the parsed document to those top-level fields; the cached
+    # Excel export is internal and can be large, so it is never returned
+    requested_fields = {f.strip() for f in (fields or "").split(",")} - {"", "excel_cache"}
+    invalid_fields = sorted(f for f in requested_fields if "$" in f or "." in f)
+    if invalid_fields:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields: {', '.join(invalid_fields)}. Only top-level field names are allowed."
+        )
+    if requested_fields:
+        parsed_projection = dict.fromkeys(requested_fields, 1)
+    else:
+        parsed_projection = {"excel_cache": 0}
+    
+    # The parsed data, document metadata and extraction record are independent
+    # lookups, so fetch them concurrently
+    doc, doc_metadata, extraction_record = await asyncio.gather(
+        parsed_collection.find_one({"_id": file_id}, parsed_projection),
+        documents_collection.find_one(
+            {"_id": file_id},
+            {
+                "original_filename": 1, "uploaded_at": 1, "status": 1, "processing_stages": 1,
+                "file_size": 1, "page_count": 1, "gridfs_file_id": 1
+            }
+        ),
+        # The extracted text itself is not returned here, only its metadata
+        extractions_collection.find_one(
+            {"file_id": file_id},
+            {"extraction_mode": 1, "method_used": 1, "num_pages": 1, "num_chars": 1, "extracted_at": 1}
+        )
+    )
     
     if not doc:
         # If no parsed data, check if document exists in documents collection
-        doc_metadata = await documents_collection.find_one({"_id": file_id})
         if not doc_metadata:
             raise HTTPException(status_code=404, detail="Document not found")
         
@@ -77,140 +298,122 @@ async def get_parsed_data(file_id: str, request: Request):
     
     # Add additional metadata from other collections if not already present
     if "processing_stages" not in doc:
-        doc_metadata = await documents_collection.find_one({"_id": file_id})
         if doc_metadata:
             doc["processing_stages"] = doc_metadata.get("processing_stages", {})
             doc["file_size"] = doc_metadata.get("file_size")
     
     # Add extraction information
-    extraction_record = await extractions_collection.find_one({"file_id": file_id})
     if extraction_record:
-        doc["extraction_info"] = {
-            "mode": extraction_record.get("extraction_mode"),
-            "method": extraction_record.get("method_used"),
-            "pages": extraction_record.get("num_pages"),
-            "chars": extraction_record.get("num_chars"),
-            "extracted_at": extraction_record.get("extracted_at")
-        }
+        doc["extraction_info"] = _extraction_info(
+            extraction_record.get("extraction_mode"),
+            extraction_record.get("method_used"),
+            extraction_record.get("num_pages"),
+            extraction_record.get("num_chars"),
+            extraction_record.get("extracted_at")
+        )
     else:
         # If no extraction data yet, try to use page count from upload first
-        doc_metadata = await documents_collection.find_one({"_id": file_id})
         if doc_metadata and doc_metadata.get("page_count"):
             # Use immediate page count from upload
-            doc["extraction_info"] = {
-                "mode": "upload_count",
-                "method": "pdfplumber",
-                "pages": doc_metadata["page_count"],
-                "chars": 0,
-                "extracted_at": None
-            }
-            print(f"📄 Using upload page count for {file_id}: {doc_metadata['page_count']} pages")
+            doc["extraction_info"] = _extraction_info("upload_count", "pdfplumber", doc_metadata["page_count"])
+            logger.debug(f"📄 Using upload page count for {file_id}: {doc_metadata['page_count']} pages")
         elif doc_metadata and "gridfs_file_id" in doc_metadata:
             try:
                 # Get PDF from GridFS and count pages
                 pdf_file = await gridfs_bucket.open_download_stream(doc_metadata["gridfs_file_id"])
                 pdf_content = await pdf_file.read()
                 
-                # Use pdf2image to count pages
-                import tempfile
-                from pdf2image import convert_from_path
+                # Read the page count from the PDF page tree - no rendering needed - on
+                # the PyMuPDF worker thread so large PDFs don't stall the event loop
+                page_count = await asyncio.get_running_loop().run_in_executor(
+                    pdf_executor, count_pages, pdf_content
+                )
                 
-                with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-                    temp_file.write(pdf_content)
-                    temp_pdf_path = temp_file.name
+                # Remember the count so later requests take the upload_count branch above
+                await documents_collection.update_one(
+                    {"_id": file_id},
+                    {"$set": {"page_count": page_count}}
+                )
                 
-                try:
-                    # Convert all pages to get count
-                    pages = convert_from_path(temp_pdf_path, dpi=50)  # Low DPI just for counting
-                    page_count = len(pages)
-                    
-                    doc["extraction_info"] = {
-                        "mode": "direct_count",
-                        "method": "pdf2image",
-                        "pages": page_count,
-                        "chars": 0,
-                        "extracted_at": None
-                    }
-                    print(f"📄 Counted {page_count} pages for {file_id}")
-                    
-                finally:
-                    import os
-                    try:
-                        os.unlink(temp_pdf_path)
-                    except:
-                        pass
+                doc["extraction_info"] = _extraction_info("direct_count", "pymupdf", page_count)
+                logger.debug(f"📄 Counted {page_count} pages for {file_id}")
                         
             except Exception as e:
-                print(f"⚠️ Could not count pages for {file_id}: {e}")
+                logger.warning(f"⚠️ Could not count pages for {file_id}: {e}")
                 # Fallback to 1 page
-                doc["extraction_info"] = {
-                    "mode": "fallback",
-                    "method": "assumed",
-                    "pages": 1,
-                    "chars": 0,
-                    "extracted_at": None
-                }
+                doc["extraction_info"] = _extraction_info("fallback", "assumed", 1)
 
     pretty = request.query_params.get("pretty") == "1"
 
     if pretty:
-        json_str = json.dumps(doc, indent=2, ensure_ascii=False, default=str)
-        return Response(content=json_str, media_type="application/json; charset=utf-8")
+        json_bytes = orjson.dumps(doc, default=str, option=ORJSON_OPTIONS | orjson.OPT_INDENT_2)
     else:
-        return JSONResponse(content=json.loads(json.dumps(doc, default=str)))
+        json_bytes = ORJSONResponse(doc).body
+    
+    # The payload combines three collections with several writers, so the ETag is
+    # taken from the rendered body; an unchanged document then costs no transfer
+    headers = {"ETag": f'"{hashlib.md5(json_bytes).hexdigest()}"', "Cache-Control": "no-cache"}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=json_bytes, media_type="application/json", headers=headers)
 
 @router.post("/api/save/{file_id}")
 async def save_parsed_document(file_id: str):
     """Save a parsed document to make it visible in the List Page"""
     try:
-        # Check if the document exists in parsed_collection
-        doc = await parsed_collection.find_one({"_id": file_id})
-        if not doc:
-            raise HTTPException(status_code=404, detail="Parsed document not found")
-        
-        # Check if already saved
-        if doc.get("saved", False):
-            return {
-                "message": "Document already saved",
-                "file_id": file_id,
-                "saved": True,
-                "saved_at": doc.get("saved_at")
-            }
-        
-        # Update the document to mark it as saved
+        # Mark as saved atomically; the filter only matches documents that are not
+        # saved yet, so concurrent saves cannot both log and stamp the document
         save_timestamp = datetime.utcnow()
         
-        await parsed_collection.update_one(
-            {"_id": file_id},
+        doc = await parsed_collection.find_one_and_update(
+            {"_id": file_id, "saved": {"$ne": True}},
             {
                 "$set": {
                     "saved": True,
-                    "saved_at": save_timestamp.isoformat()
+                    "saved_at": save_timestamp
                 }
-            }
+            },
+            projection={"parser": 1, "num_entries": 1, "original_filename": 1},
+            return_document=ReturnDocument.AFTER
         )
         
-        # Update document processing stage to include saved
-        await DocumentManager.update_processing_stage(file_id, "saved", True)
+        if not doc:
+            # Either the document does not exist or it was already saved
+            existing_doc = await parsed_collection.find_one({"_id": file_id}, {"saved_at": 1})
+            if not existing_doc:
+                raise HTTPException(status_code=404, detail="Parsed document not found")
+            
+            return ORJSONResponse({
+                "message": "Document already saved",
+                "file_id": file_id,
+                "saved": True,
+                "saved_at": existing_doc.get("saved_at")
+            })
+        
+        invalidate_document_caches(file_id)
         
-        # Log the save action
-        await LogManager.store_log(
-            file_id=file_id,
-            process_type="save",
-            log_content=f"Document saved and approved for listing: {doc.get('original_filename', 'Unknown.pdf')}",
-            metadata={
-                "parser": doc.get("parser"),
-                "num_entries": doc.get("num_entries", 0),
-                "saved_at": save_timestamp.isoformat()
-            }
+        # Update the document processing stage and log the save action concurrently
+        await asyncio.gather(
+            DocumentManager.update_processing_stage(file_id, "saved", True),
+            LogManager.store_log(
+                file_id=file_id,
+                process_type="save",
+                log_content=f"Document saved and approved for listing: {doc.get('original_filename', 'Unknown.pdf')}",
+                metadata={
+                    "parser": doc.get("parser"),
+                    "num_entries": doc.get("num_entries", 0),
+                    "saved_at": save_timestamp
+                }
+            )
         )
         
-        return {
+        return ORJSONResponse({
             "message": "Document saved successfully",
             "file_id": file_id,
             "saved": True,
-            "saved_at": save_timestamp.isoformat()
-        }
+            "saved_at": save_timestamp
+        })
         
     except HTTPException:
         raise
@@ -223,6 +426,7 @@ async def delete_parsed_document(file_id: str):
     try:
         # Use enhanced deletion with comprehensive validation and logging
         result = await DataLifecycleManager.enhanced_delete_document(file_id)
+        invalidate_document_caches(file_id)
         
         if result["errors"]:
             raise HTTPException(status_code=500, detail=f"Deletion failed: {'; '.join(result['errors'])}")
@@ -244,57 +448,114 @@ async def delete_parsed_document(file_id: str):
         raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
 
 @router.get("/api/logs/{file_id}")
-async def get_processing_logs(file_id: str, process_type: str = None):
-    """Get processing logs for a specific file"""
+async def get_processing_logs(file_id: str, process_type: str = None, limit: int = LOGS_PAGE_SIZE, before: datetime = None, before_id: str = None):
+    """Get processing logs for a specific file, newest first, one page at a time"""
+    limit = max(1, min(limit, MAX_LOGS_PAGE_SIZE))
+    
     query = {"file_id": file_id}
     if process_type:
         query["process_type"] = process_type
+    if before and before_id:
+        # Logs written in the same millisecond share logged_at, so _id breaks ties
+        # and no entry is skipped or repeated across pages
+        try:
+            before_oid = ObjectId(before_id)
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid before_id")
+        query["$or"] = [
+            {"logged_at": {"$lt": before}},
+            {"logged_at": before, "_id": {"$lt": before_oid}}
+        ]
+    elif before:
+        query["logged_at"] = {"$lt": before}
     
-    cursor = processing_logs_collection.find(query).sort("logged_at", 1)
-    logs = await cursor.to_list(length=None)
+    cursor = processing_logs_collection.find(query).sort([("logged_at", -1), ("_id", -1)]).limit(limit)
+    logs = await cursor.to_list(length=limit)
     
-    # Convert datetime objects to strings for JSON serialization
-    serializable_logs = json.loads(json.dumps(logs, default=str))
-    return {
+    # A full page means there may be older entries; pass these back as ?before=&before_id=
+    next_before = logs[-1]["logged_at"] if len(logs) == limit else None
+    next_before_id = str(logs[-1]["_id"]) if len(logs) == limit else None
+    
+    return ORJSONResponse({
         "file_id": file_id,
         "process_type": process_type,
-        "logs": serializable_logs
-    }
+        "logs": logs,
+        "next_before": next_before,
+        "next_before_id": next_before_id
+    })
 
 @router.get("/api/stats")
 async def get_system_stats():
     """Get system statistics from database"""
-    stats = {}
-    
-    # Document counts
-    stats["total_documents"] = await documents_collection.count_documents({})
-    stats["uploaded_documents"] = await documents_collection.count_documents({"processing_stages.uploaded": True})
-    stats["extracted_documents"] = await documents_collection.count_documents({"processing_stages.extracted": True})
-    stats["parsed_documents"] = await parsed_collection.count_documents({})
-    
-    # Extraction statistics
-    extraction_stats = await extractions_collection.aggregate([
-        {"$group": {
-            "_id": "$extraction_mode",
-            "count": {"$sum": 1},
-            "avg_pages": {"$avg": "$num_pages"},
-            "avg_chars": {"$avg": "$num_chars"}
-        }}
-    ]).to_list(length=None)
-    stats["extraction_modes"] = extraction_stats
-    
-    # Parser statistics  
-    parser_stats = await parsed_collection.aggregate([
-        {"$group": {
-            "_id": "$parser",
-            "count": {"$sum": 1},
-            "avg_entries": {"$avg": "$num_entries"}
-        }}
-    ]).to_list(length=None)
-    stats["parsers_used"] = parser_stats
+    cached = _stats_cache.get("system_stats")
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
     
-    # Convert datetime objects to strings for JSON serialization
-    return json.loads(json.dumps(stats, default=str))
+    async with _stats_cache_locks["system_stats"]:
+        # Another request may have refreshed the stats while this one waited
+        cached = _stats_cache.get("system_stats")
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+        
+        # All counts and aggregations are independent, so issue them concurrently.
+        # The document counters share one $facet round trip, and $project renames the
+        # group key and rounds averages server-side to keep the payload small.
+        (
+            document_counts,
+            parsed_documents,
+            extraction_modes,
+            parsers_used
+        ) = await asyncio.gather(
+            documents_collection.aggregate([
+                {"$facet": {
+                    "total": [{"$count": "n"}],
+                    "uploaded": [{"$match": {"processing_stages.uploaded": True}}, {"$count": "n"}],
+                    "extracted": [{"$match": {"processing_stages.extracted": True}}, {"$count": "n"}]
+                }}
+            ]).to_list(length=1),
+            parsed_collection.count_documents({}),
+            extractions_collection.aggregate([
+                {"$group": {
+                    "_id": "$extraction_mode",
+                    "count": {"$sum": 1},
+                    "avg_pages": {"$avg": "$num_pages"},
+                    "avg_chars": {"$avg": "$num_chars"}
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "mode": "$_id",
+                    "count": 1,
+                    "avg_pages": {"$round": ["$avg_pages", 1]},
+                    "avg_chars": {"$round": ["$avg_chars", 0]}
+                }}
+            ]).to_list(length=None),
+            parsed_collection.aggregate([
+                {"$group": {
+                    "_id": "$parser",
+                    "count": {"$sum": 1},
+                    "avg_entries": {"$avg": "$num_entries"}
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "parser": "$_id",
+                    "count": 1,
+                    "avg_entries": {"$round": ["$avg_entries", 1]}
+                }}
+            ]).to_list(length=None)
+        )
+        
+        stats = {
+            "total_documents": _facet_count(document_counts[0], "total"),
+            "uploaded_documents": _facet_count(document_counts[0], "uploaded"),
+            "extracted_documents": _facet_count(document_counts[0], "extracted"),
+            "parsed_documents": parsed_documents,
+            "extraction_modes": extraction_modes,
+            "parsers_used": parsers_used
+        }
+        
+        body = orjson.dumps(stats, default=str, option=ORJSON_OPTIONS)
+        _stats_cache["system_stats"] = body
+        return Response(content=body, media_type="application/json")
 
 # New lifecycle management endpoints
 
@@ -303,11 +564,11 @@ async def get_orphaned_documents(max_age_hours: int = 168):
     """Get list of orphaned documents (uploaded/extracted but not parsed)"""
     try:
         orphaned_docs = await DataLifecycleManager.find_orphaned_documents(max_age_hours)
-        return {
+        return ORJSONResponse({
             "found": len(orphaned_docs),
             "max_age_hours": max_age_hours,
             "orphaned_documents": orphaned_docs
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error finding orphaned documents: {str(e)}")
 
@@ -315,22 +576,34 @@ async def get_orphaned_documents(max_age_hours: int = 168):
 async def cleanup_orphaned_documents(max_age_hours: int = 168, dry_run: bool = True):
     """Clean up orphaned documents older than specified hours"""
     try:
+        orphaned_docs = await DataLifecycleManager.find_orphaned_documents(max_age_hours)
+        
         if dry_run:
-            orphaned_docs = await DataLifecycleManager.find_orphaned_documents(max_age_hours)
-            return {
+            return ORJSONResponse({
                 "dry_run": True,
                 "would_delete": len(orphaned_docs),
                 "orphaned_documents": orphaned_docs,
                 "message": "This was a dry run. Set dry_run=false to actually delete."
-            }
+            })
         else:
-            # Real cleanup - implement cleanup_orphaned_document method
-            orphaned_docs = await DataLifecycleManager.find_orphaned_documents(max_age_hours)
-            cleanup_results = []
+            # Real cleanup - delete orphans concurrently, bounded so Mongo isn't flooded
+            semaphore = asyncio.Semaphore(ORPHAN_CLEANUP_CONCURRENCY)
+            
+            async def delete_orphan(doc):
+                async with semaphore:
+                    return await DataLifecycleManager.enhanced_delete_document(doc["file_id"])
+            
+            results = await asyncio.gather(
+                *(delete_orphan(doc) for doc in orphaned_docs),
+                return_exceptions=True
+            )
             
-            for doc in orphaned_docs:
-                result = await DataLifecycleManager.enhanced_delete_document(doc["file_id"])
-                cleanup_results.append(result)
+            # A failure for one orphan must not abort the rest; report it in the usual shape
+            cleanup_results = [
+                {"file_id": doc["file_id"], "deleted_items": [], "errors": [str(result)], "warnings": []}
+                if isinstance(result, Exception) else result
+                for doc, result in zip(orphaned_docs, results)
+            ]
             
             successful = sum(1 for r in cleanup_results if not r["errors"])
             failed = len(cleanup_results) - successful
@@ -349,38 +622,69 @@ async def cleanup_orphaned_documents(max_age_hours: int = 168, dry_run: bool = T
 async def get_lifecycle_stats():
     """Get comprehensive data lifecycle statistics"""
     try:
-        # Basic counts
-        stats = {
-            "total_documents": await documents_collection.count_documents({}),
-            "total_extractions": await extractions_collection.count_documents({}),
-            "total_parsed": await parsed_collection.count_documents({}),
-            "total_logs": await processing_logs_collection.count_documents({})
-        }
-        
-        # Processing stage analysis
-        stats["workflow_stages"] = {
-            "uploaded_only": await documents_collection.count_documents({
-                "processing_stages.uploaded": True,
-                "processing_stages.extracted": False,
-                "processing_stages.parsed": False
-            }),
-            "extracted_not_parsed": await documents_collection.count_documents({
-                "processing_stages.uploaded": True,
-                "processing_stages.extracted": True,
-                "processing_stages.parsed": False
-            }),
-            "fully_processed": await documents_collection.count_documents({
-                "processing_stages.uploaded": True,
-                "processing_stages.extracted": True,
-                "processing_stages.parsed": True
-            })
-        }
-        
-        # Orphaned documents count (7 days instead of 24 hours)
-        orphaned_docs = await DataLifecycleManager.find_orphaned_documents(168)  # Changed from 24 to 168 hours  
-        stats["orphaned_documents_7d"] = len(orphaned_docs)  # Changed name to reflect 7 days
+        cached = _stats_cache.get("lifecycle_stats")
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
         
-        return stats
+        async with _stats_cache_locks["lifecycle_stats"]:
+            # Another request may have refreshed the stats while this one waited
+            cached = _stats_cache.get("lifecycle_stats")
+            if cached is not None:
+                return Response(content=cached, media_type="application/json")
+            
+            # Basic counts, processing stage analysis and orphan detection are independent,
+            # so run them concurrently
+            (
+                total_extractions,
+                total_parsed,
+                total_logs,
+                stage_buckets,
+                orphaned_docs
+            ) = await asyncio.gather(
+                extractions_collection.count_documents({}),
+                parsed_collection.count_documents({}),
+                processing_logs_collection.count_documents({}),
+                # One pass groups documents by their (uploaded, extracted, parsed) flags;
+                # the bucket sizes also add up to the total document count
+                documents_collection.aggregate([
+                    {"$group": {
+                        "_id": {
+                            "uploaded": "$processing_stages.uploaded",
+                            "extracted": "$processing_stages.extracted",
+                            "parsed": "$processing_stages.parsed"
+                        },
+                        "n": {"$sum": 1}
+                    }}
+                ]).to_list(length=None),
+                # Orphaned documents (7 days instead of 24 hours)
+                DataLifecycleManager.find_orphaned_documents(168)  # Changed from 24 to 168 hours
+            )
+            
+            stage_counts = {
+                (b["_id"].get("uploaded"), b["_id"].get("extracted"), b["_id"].get("parsed")): b["n"]
+                for b in stage_buckets
+            }
+            uploaded_only = stage_counts.get((True, False, False), 0)
+            extracted_not_parsed = stage_counts.get((True, True, False), 0)
+            fully_processed = stage_counts.get((True, True, True), 0)
+            total_documents = sum(b["n"] for b in stage_buckets)
+            
+            stats = {
+                "total_documents": total_documents,
+                "total_extractions": total_extractions,
+                "total_parsed": total_parsed,
+                "total_logs": total_logs,
+                "workflow_stages": {
+                    "uploaded_only": uploaded_only,
+                    "extracted_not_parsed": extracted_not_parsed,
+                    "fully_processed": fully_processed
+                },
+                "orphaned_documents_7d": len(orphaned_docs)  # Changed name to reflect 7 days
+            }
+            
+            body = orjson.dumps(stats, default=str, option=ORJSON_OPTIONS)
+            _stats_cache["lifecycle_stats"] = body
+            return Response(content=body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting lifecycle stats: {str(e)}")
 
@@ -388,33 +692,38 @@ async def get_lifecycle_stats():
 async def cleanup_failed_parsing_results():
     """Clean up failed parsing results that were incorrectly saved to database"""
     try:
-        # Find documents with failed parsing results
-        failed_docs = []
-        cursor = parsed_collection.find({})
-        
-        async for doc in cursor:
-            if doc.get("tables"):
-                for table in doc["tables"]:
-                    if isinstance(table, dict) and table.get("success") is False:
-                        failed_docs.append({
-                            "file_id": doc["_id"],
-                            "parser": doc.get("parser"),
-                            "error": table.get("error", "Unknown error"),
-                            "filename": doc.get("original_filename")
-                        })
-                        break
-        
-        # Remove failed parsing results
-        cleanup_results = []
-        for failed_doc in failed_docs:
-            file_id = failed_doc["file_id"]
-            
-            # Delete from parsed_collection
-            delete_result = await parsed_collection.delete_one({"_id": file_id})
-            
-            # Log the cleanup
-            await LogManager.store_log(
-                file_id=file_id,
+        # Find documents with failed parsing results - only matching documents leave the
+        # server, and the positional projection returns just the first failed table of each
+        cursor = parsed_collection.find(
+            {"tables": {"$elemMatch": {"success": False}}},
+            {"_id": 1, "parser": 1, "original_filename": 1, "tables.$": 1}
+        )
+        
+        failed_docs = [
+            {
+                "file_id": doc["_id"],
+                "parser": doc.get("parser"),
+                "error": doc["tables"][0].get("error", "Unknown error"),
+                "filename": doc.get("original_filename")
+            }
+            async for doc in cursor
+        ]
+        
+        # Remove all failed parsing results in a single round trip
+        failed_ids = [failed_doc["file_id"] for failed_doc in failed_docs]
+        remaining_ids = set()
+        if failed_ids:
+            delete_result = await parsed_collection.delete_many({"_id": {"$in": failed_ids}})
+            invalidate_document_caches(*failed_ids)
+            if delete_result.deleted_count < len(failed_ids):
+                remaining_ids = {
+                    doc["_id"] async for doc in parsed_collection.find({"_id": {"$in": failed_ids}}, {"_id": 1})
+                }
+        
+        # Log the cleanup for each removed document
+        await asyncio.gather(*(
+            LogManager.store_log(
+                file_id=failed_doc["file_id"],
                 process_type="cleanup",
                 log_content=f"Removed failed parsing result: {failed_doc['error']}",
                 metadata={
@@ -423,14 +732,19 @@ async def cleanup_failed_parsing_results():
                     "error": failed_doc["error"]
                 }
             )
-            
-            cleanup_results.append({
-                "file_id": file_id,
+            for failed_doc in failed_docs
+        ))
+        
+        cleanup_results = [
+            {
+                "file_id": failed_doc["file_id"],
                 "filename": failed_doc["filename"],
                 "parser": failed_doc["parser"],
                 "error": failed_doc["error"],
-                "removed": delete_result.deleted_count > 0
-            })
+                "removed": failed_doc["file_id"] not in remaining_ids
+            }
+            for failed_doc in failed_docs
+        ]
         
         return {
             "message": "Failed parsing results cleanup completed",
@@ -444,123 +758,116 @@ async def cleanup_failed_parsing_results():
 
 @router.get("/api/page-preview/{file_id}/{page_num}")
 async def get_page_preview(file_id: str, page_num: int):
-    """Get a preview image of a specific page from a PDF"""
+    """Get a PNG preview image of a specific page from a PDF"""
     try:
-        print(f"🔵 PAGE PREVIEW: Request for file_id={file_id}, page={page_num}")
+        logger.debug(f"🔵 PAGE PREVIEW: Request for file_id={file_id}, page={page_num}")
         
         # Validate page number
         if page_num < 1:
-            print(f"❌ PAGE PREVIEW: Invalid page number: {page_num}")
+            logger.debug(f"❌ PAGE PREVIEW: Invalid page number: {page_num}")
             raise HTTPException(status_code=400, detail="Page number must be >= 1")
             
         # Check if document exists in documents collection
-        print(f"🔵 PAGE PREVIEW: Checking documents collection for {file_id}")
-        doc = await documents_collection.find_one({"_id": file_id})
+        logger.debug(f"🔵 PAGE PREVIEW: Checking documents collection for {file_id}")
+        doc = await documents_collection.find_one({"_id": file_id}, {"original_filename": 1, "gridfs_file_id": 1})
         if not doc:
-            print(f"❌ PAGE PREVIEW: Document not found in documents collection: {file_id}")
+            logger.debug(f"❌ PAGE PREVIEW: Document not found in documents collection: {file_id}")
             
-            # Let's also check what documents DO exist
-            all_docs = await documents_collection.find({}, {"_id": 1, "original_filename": 1}).to_list(length=10)
-            print(f"📋 PAGE PREVIEW: Available documents in DB: {all_docs}")
+            if logger.isEnabledFor(logging.DEBUG):
+                # Let's also check what documents DO exist
+                all_docs = await documents_collection.find({}, {"_id": 1, "original_filename": 1}).to_list(length=10)
+                logger.debug(f"📋 PAGE PREVIEW: Available documents in DB: {all_docs}")
             
             raise HTTPException(status_code=404, detail="Document not found")
 
-        print(f"✅ PAGE PREVIEW: Document found: {doc.get('original_filename')}")
-        print(f"🔵 PAGE PREVIEW: GridFS file_id: {doc.get('gridfs_file_id')}")
+        logger.debug(f"✅ PAGE PREVIEW: Document found: {doc.get('original_filename')}")
+        logger.debug(f"🔵 PAGE PREVIEW: GridFS file_id: {doc.get('gridfs_file_id')}")
+
+        # Use the GridFS file ID from the document metadata, not the document file_id
+        gridfs_file_id = doc.get("gridfs_file_id")
+        cache_key = f"{gridfs_file_id}_{page_num}_{PREVIEW_DPI}"
+        preview_headers = {
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": f'"{gridfs_file_id}-{page_num}-{PREVIEW_DPI}"',
+            **IDENTITY_ENCODING
+        }
+        
+        # Serve a previously rendered preview if one is cached
+        if gridfs_file_id:
+            try:
+                cached_preview = await previews_bucket.open_download_stream_by_name(cache_key)
+                png_bytes = await cached_preview.read()
+                logger.debug(f"✅ PAGE PREVIEW: Serving cached preview {cache_key}")
+                return Response(content=png_bytes, media_type="image/png", headers=preview_headers)
+            except NoFile:
+                pass
 
         # Check if file exists in GridFS
         try:
-            print(f"🔵 PAGE PREVIEW: Opening GridFS stream for {file_id}")
-            # Use the GridFS file ID from the document metadata, not the document file_id
-            gridfs_file_id = doc.get("gridfs_file_id")
+            logger.debug(f"🔵 PAGE PREVIEW: Opening GridFS stream for {file_id}")
             if not gridfs_file_id:
                 raise Exception("No GridFS file_id found in document metadata")
             
-            print(f"🔵 PAGE PREVIEW: Using GridFS file_id: {gridfs_file_id}")
+            logger.debug(f"🔵 PAGE PREVIEW: Using GridFS file_id: {gridfs_file_id}")
             pdf_file = await gridfs_bucket.open_download_stream(gridfs_file_id)
             pdf_content = await pdf_file.read()
-            print(f"✅ PAGE PREVIEW: PDF content retrieved, size: {len(pdf_content)} bytes")
+            logger.debug(f"✅ PAGE PREVIEW: PDF content retrieved, size: {len(pdf_content)} bytes")
         except Exception as e:
-            print(f"❌ PAGE PREVIEW: GridFS error for {file_id}: {e}")
-            
-            # Let's also check what files are in GridFS
-            files_cursor = gridfs_bucket.find({"metadata.file_id": file_id})
-            gridfs_files = await files_cursor.to_list(length=10)
-            print(f"📋 PAGE PREVIEW: GridFS files for this file_id: {gridfs_files}")
+            logger.warning(f"❌ PAGE PREVIEW: GridFS error for {file_id}: {e}")
             
-            # Check all GridFS files
-            all_files_cursor = gridfs_bucket.find({})
-            all_gridfs_files = await all_files_cursor.to_list(length=10)
-            print(f"📋 PAGE PREVIEW: All GridFS files: {[f.get('metadata', {}).get('file_id') for f in all_gridfs_files]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                # Let's also check what files are in GridFS
+                files_cursor = gridfs_bucket.find({"metadata.file_id": file_id})
+                gridfs_files = await files_cursor.to_list(length=10)
+                logger.debug(f"📋 PAGE PREVIEW: GridFS files for this file_id: {gridfs_files}")
+                
+                # Check all GridFS files
+                all_files_cursor = gridfs_bucket.find({})
+                all_gridfs_files = await all_files_cursor.to_list(length=10)
+                logger.debug(f"📋 PAGE PREVIEW: All GridFS files: {[f.get('metadata', {}).get('file_id') for f in all_gridfs_files]}")
             
             raise HTTPException(status_code=404, detail="PDF file not found in storage")
         
-        # Create temporary file
-        temp_pdf_path = None
-        try:
-            print(f"🔵 PAGE PREVIEW: Creating temporary file")
-            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-                temp_file.write(pdf_content)
-                temp_pdf_path = temp_file.name
-            
-            print(f"✅ PAGE PREVIEW: Temporary file created: {temp_pdf_path}")
-
-            # Convert the specific page to image (pdf2image uses 1-indexed pages)
-            print(f"🔵 PAGE PREVIEW: Converting page {page_num} to image...")
-            pages = convert_from_path(
-                temp_pdf_path, 
-                dpi=120,  # Reduced DPI for faster loading
-                first_page=page_num, 
-                last_page=page_num
-            )
-            
-            if not pages:
-                print(f"❌ PAGE PREVIEW: No pages found for page number {page_num}")
-                raise HTTPException(status_code=404, detail=f"Page {page_num} not found")
-            
-            print(f"✅ PAGE PREVIEW: Page {page_num} converted successfully")
-            
-            # Convert to base64
-            buffer = BytesIO()
-            pages[0].save(buffer, format="PNG", optimize=True)
-            image_b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-            
-            print(f"🎉 PAGE PREVIEW: Preview generated successfully for page {page_num}")
-            
-            return {
-                "success": True,
-                "page_num": page_num,
-                "image": f"data:image/png;base64,{image_b64}",
-                "file_id": file_id,
-                "timestamp": asyncio.get_event_loop().time()  # Add timestamp to prevent caching
-            }
-            
-        finally:
-            # Clean up temporary file
-            if temp_pdf_path and os.path.exists(temp_pdf_path):
-                try:
-                    os.unlink(temp_pdf_path)
-                    print(f"✅ PAGE PREVIEW: Cleaned up temporary file: {temp_pdf_path}")
-                except Exception as cleanup_error:
-                    print(f"⚠️ PAGE PREVIEW: Failed to cleanup temp file {temp_pdf_path}: {cleanup_error}")
+        # Render the requested page straight from the in-memory PDF, off the event loop
+        logger.debug(f"🔵 PAGE PREVIEW: Rendering page {page_num}...")
+        png_bytes = await asyncio.get_running_loop().run_in_executor(
+            pdf_executor, render_page_png, pdf_content, page_num, PREVIEW_DPI
+        )
+        
+        if png_bytes is None:
+            logger.debug(f"❌ PAGE PREVIEW: No pages found for page number {page_num}")
+            raise HTTPException(status_code=404, detail=f"Page {page_num} not found")
+        
+        logger.debug(f"✅ PAGE PREVIEW: Page {page_num} rendered successfully")
+        
+        # Cache the rendered page so later requests skip the PDF download and render
+        await previews_bucket.upload_from_stream(
+            cache_key,
+            png_bytes,
+            metadata={"file_id": file_id, "page_num": page_num, "dpi": PREVIEW_DPI}
+        )
+        
+        logger.debug(f"🎉 PAGE PREVIEW: Preview generated successfully for page {page_num}")
+        
+        return Response(content=png_bytes, media_type="image/png", headers=preview_headers)
                     
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
-        print(f"❌ PAGE PREVIEW: Unexpected error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ PAGE PREVIEW: Unexpected error: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating page preview: {str(e)}")
 
 @router.put("/api/update/{file_id}")
 async def update_parsed_document(file_id: str, request: Request):
     """Update the parsed data for a specific document"""
     try:
-        # Get the updated data from request body
-        updated_data = await request.json()
+        # Get the updated data from request body; edited documents can be large,
+        # so decode them with orjson rather than the stdlib parser Request.json() uses
+        updated_data = orjson.loads(await request.body())
         
-        # Check if the document exists in parsed_collection
+        # Check if the document exists in parsed_collection; the full document is
+        # needed to work out which fields the edit actually changed
         existing_doc = await parsed_collection.find_one({"_id": file_id})
         if not existing_doc:
             raise HTTPException(status_code=404, detail="Parsed document not found")
@@ -582,12 +889,16 @@ async def update_parsed_document(file_id: str, request: Request):
         
         # Update the document in the collection
         update_timestamp = datetime.utcnow()
-        merged_data["last_modified"] = update_timestamp.isoformat()
+        merged_data["last_modified"] = update_timestamp
         
-        await parsed_collection.replace_one(
-            {"_id": file_id},
-            merged_data
-        )
+        # Write only the paths that differ instead of rewriting the whole document;
+        # fall back to a full replace if a top-level key can't be addressed by path
+        update = _diff_update(existing_doc, merged_data)
+        if update is None:
+            await parsed_collection.replace_one({"_id": file_id}, merged_data)
+        else:
+            await parsed_collection.update_one({"_id": file_id}, update)
+        invalidate_document_caches(file_id)
         
         # Log the update action
         await LogManager.store_log(
@@ -596,26 +907,26 @@ async def update_parsed_document(file_id: str, request: Request):
             log_content=f"Document data updated: {existing_doc.get('original_filename', 'Unknown.pdf')}",
             metadata={
                 "parser": existing_doc.get("parser"),
-                "modified_at": update_timestamp.isoformat(),
+                "modified_at": update_timestamp,
                 "updated_by": "user_edit"
             }
         )
         
-        return {
+        return ORJSONResponse({
             "message": "Document updated successfully",
             "file_id": file_id,
-            "last_modified": update_timestamp.isoformat()
-        }
+            "last_modified": update_timestamp
+        })
         
     except HTTPException:
         raise
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON in request body")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating document: {str(e)}")
 
 @router.get("/api/file/{file_id}")
-async def get_file(file_id: str):
+async def get_file(file_id: str, request: Request):
     """Serve PDF file for viewing"""
     from fastapi.responses import FileResponse
     import os
@@ -623,35 +934,43 @@ async def get_file(file_id: str):
     try:
         # Try to serve from local directory first
         file_path = f"data/uploaded_pdfs/original_{file_id}.pdf"
-        if os.path.exists(file_path):
+        if await asyncio.to_thread(os.path.exists, file_path):
             return FileResponse(
                 path=file_path,
                 media_type="application/pdf",
-                headers={"Content-Disposition": "inline"}
+                headers={"Content-Disposition": "inline", **IDENTITY_ENCODING}
             )
         
-        # If not found locally, try to get from GridFS
-        doc = await documents_collection.find_one({"_id": file_id})
-        if not doc:
+        # If not found locally, stream it from GridFS
+        doc = await documents_collection.find_one({"_id": file_id}, {"gridfs_file_id": 1})
+        if not doc or "gridfs_file_id" not in doc:
             raise HTTPException(status_code=404, detail="File not found")
         
-        # Get file from GridFS
         try:
-            file_data = await gridfs_bucket.download_to_stream(file_id)
-            # Create a temporary file to serve
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-                temp_file.write(file_data.getvalue())
-                temp_path = temp_file.name
-            
-            return FileResponse(
-                path=temp_path,
-                media_type="application/pdf",
-                headers={"Content-Disposition": "inline"},
-                background=None  # Don't auto-delete the temp file
-            )
-        except Exception as gridfs_error:
+            grid_out = await gridfs_bucket.open_download_stream(doc["gridfs_file_id"])
+        except NoFile:
             raise HTTPException(status_code=404, detail="File not found in storage")
+        
+        # A GridFS file never changes once written, so its id and upload date identify it
+        etag = f'"{grid_out._id}-{int(grid_out.upload_date.timestamp())}"'
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        async def iter_chunks():
+            # Yield one GridFS chunk at a time so memory stays constant regardless of file size
+            while chunk := await grid_out.readchunk():
+                yield chunk
+        
+        return StreamingResponse(
+            iter_chunks(),
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": "inline",
+                "Content-Length": str(grid_out.length),
+                "ETag": etag,
+                **IDENTITY_ENCODING
+            }
+        )
     
     except HTTPException:
         raise
@@ -661,17 +980,17 @@ async def get_file(file_id: str):
 @router.get("/api/extracted-text/{file_id}")
 async def get_extracted_text(file_id: str):
     """Serve extracted text file for viewing"""
-    from fastapi.responses import PlainTextResponse
+    from fastapi.responses import FileResponse
     import os
     
     try:
-        # Look for the extracted text file
+        # Look for the extracted text file; FileResponse streams it off the event
+        # loop and handles Range requests
         file_path = f"data/extracted_pages/extracted_digital_{file_id}.txt"
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return PlainTextResponse(
-                content=content,
+        if await asyncio.to_thread(os.path.exists, file_path):
+            return FileResponse(
+                path=file_path,
+                media_type="text/plain; charset=utf-8",
                 headers={"Content-Disposition": "inline"}
             )
         else:
@@ -691,7 +1010,7 @@ async def upload_to_unite(file_id: str):
     
     try:
         # Check if document exists
-        doc = await parsed_collection.find_one({"_id": file_id})
+        doc = await parsed_collection.find_one({"_id": file_id}, {"_id": 1})
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
         
@@ -706,6 +1025,7 @@ async def upload_to_unite(file_id: str):
                 "unite_upload_initiated_at": datetime.utcnow()
             }}
         )
+        invalidate_document_caches(file_id)
         
         # In the future, you could trigger the bot script here:
         # bot_path = os.path.join(os.path.dirname(__file__), "../../unite-login-bot/login.py")
@@ -730,11 +1050,16 @@ async def upload_to_unite(file_id: str):
                 "unite_error_at": datetime.utcnow()
             }}
         )
+        invalidate_document_caches(file_id)
         raise HTTPException(status_code=500, detail=f"Failed to queue upload: {str(e)}")
 
 @router.get("/api/unite/status/{file_id}")
 async def get_unite_status(file_id: str):
     """Get the Unite upload status for a document"""
+    cached = unite_status_cache.get(file_id)
+    if cached is not None:
+        return ORJSONResponse(cached)
+    
     try:
         doc = await parsed_collection.find_one(
             {"_id": file_id},
@@ -744,301 +1069,325 @@ async def get_unite_status(file_id: str):
         if not doc:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        return {
+        status = {
             "file_id": file_id,
             "unite_status": doc.get("unite_status", "pending"),
             "unite_uploaded_at": doc.get("unite_uploaded_at"),
             "unite_error": doc.get("unite_error")
         }
+        unite_status_cache[file_id] = status
+        return ORJSONResponse(status)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get status: {str(e)}")
 
-@router.get("/api/export/excel/{file_id}")
-async def export_to_excel(file_id: str):
-    """Export parsed data to Excel format"""
+def _excel_version(doc: dict) -> str:
+    """Fingerprint the parts of a parsed document that determine its Excel export"""
+    fingerprint = f"{doc.get('uploaded_at')}|{doc.get('saved_at')}|{doc.get('last_modified')}|{doc.get('table_count')}"
+    return hashlib.md5(fingerprint.encode()).hexdigest()
+
+def _entry_type(account_name, account_number, amount) -> str:
+    """Classify a Daybook entry for the export's Type column based on available data"""
+    if account_number:
+        return "Account"
+    if account_name and 'S/O' in account_name:
+        return "Person"
+    if amount is not None and amount > 0:
+        return "Transaction"
+    return "Entry"
+
+def _build_xlsx(doc: dict, output) -> int:
+    """
+    Render a saved parsed document as an .xlsx workbook.
+
+    This is synchronous, CPU-bound openpyxl work; call it via asyncio.to_thread
+    so the event loop keeps serving other requests during large exports.
+
+    Args:
+        doc: Parsed document with validated, non-empty tables
+        output: Writable, seekable binary file object the workbook is saved to
+
+    Returns:
+        int: Size of the workbook in bytes
+    """
+    original_filename = doc.get("original_filename", "Unknown.pdf")
+    parser_used = doc.get("parser", "Unknown")
+    tables = doc.get("tables", [])
+    
+    # Create a streaming workbook; rows are serialized as they are appended
+    # instead of being kept as Cell objects until save, and _write_sheet appends
+    # each row as soon as it is produced
     try:
-        # Validate file_id format
-        if not file_id or len(file_id.strip()) == 0:
-            raise HTTPException(status_code=400, detail="Invalid file ID provided")
-        
-        # Get parsed data from database
-        doc = await parsed_collection.find_one({"_id": file_id})
-        
-        if not doc:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Parsed document with ID '{file_id}' not found. Please ensure the document has been processed and saved."
-            )
-        
-        if not doc.get("saved", False):
-            raise HTTPException(
-                status_code=400, 
-                detail="Document must be saved before exporting. Please save the document first and try again."
-            )
-        
-        # Get document metadata for filename
-        original_filename = doc.get("original_filename", "Unknown.pdf")
-        parser_used = doc.get("parser", "Unknown")
-        tables = doc.get("tables", [])
-        
-        if not tables:
-            raise HTTPException(
-                status_code=400, 
-                detail="No parsed data available for export. Please ensure the document has been parsed successfully."
-            )
-        
-        # Validate that tables contain actual data
-        has_data = False
-        for table in tables:
-            if isinstance(table, dict) and table:
-                has_data = True
-                break
-        
-        if not has_data:
-            raise HTTPException(
-                status_code=400,
-                detail="No valid data found in parsed tables. Please re-parse the document."
-            )
+        wb = Workbook(write_only=True)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create Excel workbook: {str(e)}"
+        )
+    
+    # Register every cell style once as a named style; assigning a named style
+    # to a cell is a single lookup instead of one per font/fill/border/alignment
+    try:
+        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+        section_fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
+        totals_fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
+        border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+        center_alignment = Alignment(horizontal='center', vertical='center')
         
-        # Create Excel workbook
-        try:
-            wb = Workbook()
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to create Excel workbook: {str(e)}"
-            )
+        for style in (
+            NamedStyle(name="header", font=Font(bold=True, color="FFFFFF"), fill=header_fill, border=border, alignment=center_alignment),
+            NamedStyle(name="bordered", font=DEFAULT_FONT, border=border),
+            NamedStyle(name="money", font=DEFAULT_FONT, border=border, number_format='#,##0.00'),
+            NamedStyle(name="total_amount", font=DEFAULT_FONT, border=DEFAULT_BORDER, number_format='#,##0.00'),
+            NamedStyle(name="society", font=Font(bold=True, size=14), fill=section_fill, border=DEFAULT_BORDER, alignment=center_alignment),
+            NamedStyle(name="totals_header", font=Font(bold=True), fill=totals_fill, border=DEFAULT_BORDER, alignment=center_alignment),
+            NamedStyle(name="amount_in_words", font=Font(italic=True), border=DEFAULT_BORDER, alignment=Alignment(horizontal='left')),
+            NamedStyle(name="document_title", font=Font(bold=True, size=14, color="FFFFFF"), fill=header_fill, border=DEFAULT_BORDER, alignment=center_alignment),
+            NamedStyle(name="table_title", font=Font(bold=True), fill=section_fill, border=DEFAULT_BORDER, alignment=center_alignment),
+        ):
+            wb.add_named_style(style)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create Excel styles: {str(e)}"
+        )
+    
+    if parser_used == "DaybookParser":
+        # Handle Daybook data structure
+        ws = wb.create_sheet("Daybook Data")
         
-        # Define styles
-        try:
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            center_alignment = Alignment(horizontal='center', vertical='center')
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to create Excel styles: {str(e)}"
-            )
+        def amount_value(value):
+            if value is None:
+                return _Styled("", "bordered")
+            return _Styled(float(value), "money")
         
-        if parser_used == "DaybookParser":
-            # Handle Daybook data structure
-            ws = wb.active
-            ws.title = "Daybook Data"
-            
-            # Track current row
-            current_row = 1
-            
-            for table_idx, table in enumerate(tables):
+        def daybook_rows():
+            blank = ((), None)
+            for table in tables:
                 # Society header
-                ws.merge_cells(f'A{current_row}:E{current_row}')
-                cell = ws[f'A{current_row}']
-                cell.value = f"Society: {table.get('society_name', 'N/A')}"
-                cell.font = Font(bold=True, size=14)
-                cell.fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
-                cell.alignment = center_alignment
-                current_row += 1
+                yield (_Styled(f"Society: {table.get('society_name', 'N/A')}", "society"),), 5
                 
                 # Village and Date info
-                ws[f'A{current_row}'] = "Village:"
-                ws[f'B{current_row}'] = table.get('village_name', 'N/A')
-                ws[f'C{current_row}'] = "Date:"
-                ws[f'D{current_row}'] = table.get('date', 'N/A')
-                current_row += 2
+                yield ("Village:", table.get('village_name', 'N/A'), "Date:", table.get('date', 'N/A')), None
+                yield blank
                 
                 # Entries table headers
                 headers = ['Account Name', 'Account Number', 'Amount', 'Total Amount', 'Type']
-                for col_idx, header in enumerate(headers, 1):
-                    cell = ws.cell(row=current_row, column=col_idx, value=header)
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.border = border
-                    cell.alignment = center_alignment
-                current_row += 1
+                yield tuple(_Styled(header, "header") for header in headers), None
                 
                 # Entries data
-                entries = table.get('entries', [])
-                for entry in entries:
-                    ws.cell(row=current_row, column=1, value=entry.get('account_name', '')).border = border
-                    ws.cell(row=current_row, column=2, value=entry.get('account_number', '')).border = border
-                    
+                for entry in table.get('entries', []):
+                    account_name = entry.get('account_name', '')
+                    account_number = entry.get('account_number', '')
                     amount = entry.get('amount')
-                    if amount is not None:
-                        ws.cell(row=current_row, column=3, value=float(amount)).border = border
-                        ws.cell(row=current_row, column=3, value=float(amount)).number_format = '#,##0.00'
-                    else:
-                        ws.cell(row=current_row, column=3, value="").border = border
-                    
-                    total_amount = entry.get('total_amount')
-                    if total_amount is not None:
-                        ws.cell(row=current_row, column=4, value=float(total_amount)).border = border
-                        ws.cell(row=current_row, column=4, value=float(total_amount)).number_format = '#,##0.00'
-                    else:
-                        ws.cell(row=current_row, column=4, value="").border = border
                     
-                    # Determine entry type based on available data
-                    entry_type = "Entry"
-                    if entry.get('account_number'):
-                        entry_type = "Account"
-                    elif 'S/O' in entry.get('account_name', ''):
-                        entry_type = "Person"
-                    elif amount is not None and amount > 0:
-                        entry_type = "Transaction"
-                    
-                    ws.cell(row=current_row, column=5, value=entry_type).border = border
-                    current_row += 1
+                    yield (
+                        _Styled(account_name, "bordered"),
+                        _Styled(account_number, "bordered"),
+                        amount_value(amount),
+                        amount_value(entry.get('total_amount')),
+                        _Styled(_entry_type(account_name, account_number, amount), "bordered")
+                    ), None
                 
                 # Totals section
-                current_row += 1
+                yield blank
                 totals = table.get('totals', {})
                 if totals:
-                    # Totals header
-                    ws.merge_cells(f'A{current_row}:E{current_row}')
-                    cell = ws[f'A{current_row}']
-                    cell.value = "TOTALS"
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
-                    cell.alignment = center_alignment
-                    current_row += 1
+                    yield (_Styled("TOTALS", "totals_header"),), 5
                     
-                    # Total items
                     for key, value in totals.items():
                         if value is not None:
-                            ws.cell(row=current_row, column=1, value=key.replace('_', ' ').title())
-                            ws.cell(row=current_row, column=2, value=float(value))
-                            ws.cell(row=current_row, column=2).number_format = '#,##0.00'
-                            current_row += 1
+                            yield (key.replace('_', ' ').title(), _Styled(float(value), "total_amount")), None
                 
                 # Amount in words
                 amount_in_words = table.get('amount_in_words', '')
                 if amount_in_words:
-                    current_row += 1
-                    ws.merge_cells(f'A{current_row}:E{current_row}')
-                    cell = ws[f'A{current_row}']
-                    cell.value = f"Amount in Words: {amount_in_words}"
-                    cell.font = Font(italic=True)
-                    cell.alignment = Alignment(horizontal='left')
+                    yield blank
+                    yield (_Styled(f"Amount in Words: {amount_in_words}", "amount_in_words"),), 5
+                else:
+                    yield blank
                 
-                current_row += 3  # Add space between tables
-            
-            # Auto-adjust column widths
-            column_widths = {}
-            for row in ws.iter_rows():
-                for cell in row:
-                    if cell.coordinate and cell.value:
-                        col_letter = cell.column_letter
-                        if col_letter not in column_widths:
-                            column_widths[col_letter] = 0
-                        try:
-                            width = len(str(cell.value))
-                            if width > column_widths[col_letter]:
-                                column_widths[col_letter] = width
-                        except:
-                            pass
-            
-            for col_letter, width in column_widths.items():
-                adjusted_width = min(width + 2, 50)
-                ws.column_dimensions[col_letter].width = adjusted_width
+                # Space between tables
+                yield blank
+                yield blank
         
-        else:
-            # Handle other parser types generically
-            ws = wb.active
-            ws.title = f"{parser_used} Data"
-            
-            # Add summary sheet first
-            current_row = 1
+        _write_sheet(ws, daybook_rows, max_width=50)
+    
+    else:
+        # Handle other parser types generically
+        ws = wb.create_sheet(f"{parser_used} Data")
+        
+        def generic_rows():
+            blank = ((), None)
             
             # Document info header
-            ws.merge_cells(f'A{current_row}:D{current_row}')
-            cell = ws[f'A{current_row}']
-            cell.value = f"Document: {original_filename} (Parser: {parser_used})"
-            cell.font = Font(bold=True, size=14)
-            cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            cell.font = Font(bold=True, size=14, color="FFFFFF")
-            cell.alignment = center_alignment
-            current_row += 2
+            yield (_Styled(f"Document: {original_filename} (Parser: {parser_used})", "document_title"),), 4
+            yield blank
             
             # Process each table
             for table_idx, table in enumerate(tables):
-                ws.merge_cells(f'A{current_row}:D{current_row}')
-                cell = ws[f'A{current_row}']
-                cell.value = f"Table {table_idx + 1}"
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
-                cell.alignment = center_alignment
-                current_row += 1
+                yield (_Styled(f"Table {table_idx + 1}", "table_title"),), 4
                 
                 # Convert table data to key-value pairs
                 if isinstance(table, dict):
                     for key, value in table.items():
-                        ws.cell(row=current_row, column=1, value=str(key).replace('_', ' ').title())
-                        
                         # Handle different value types
                         if isinstance(value, (list, dict)):
-                            ws.cell(row=current_row, column=2, value=str(value)[:100] + "..." if len(str(value)) > 100 else str(value))
+                            cell_value = str(value)[:100] + "..." if len(str(value)) > 100 else str(value)
                         elif isinstance(value, (int, float)):
-                            ws.cell(row=current_row, column=2, value=value)
+                            cell_value = value
                         else:
-                            ws.cell(row=current_row, column=2, value=str(value) if value is not None else "")
+                            cell_value = str(value) if value is not None else ""
                         
-                        current_row += 1
+                        yield (str(key).replace('_', ' ').title(), cell_value), None
                 
-                current_row += 2  # Space between tables
-            
-            # Auto-adjust column widths
-            column_widths = {}
-            for row in ws.iter_rows():
-                for cell in row:
-                    if cell.coordinate and cell.value:
-                        col_letter = cell.column_letter
-                        if col_letter not in column_widths:
-                            column_widths[col_letter] = 0
-                        try:
-                            width = len(str(cell.value))
-                            if width > column_widths[col_letter]:
-                                column_widths[col_letter] = width
-                        except:
-                            pass
-            
-            for col_letter, width in column_widths.items():
-                adjusted_width = min(width + 2, 80)
-                ws.column_dimensions[col_letter].width = adjusted_width
+                # Space between tables
+                yield blank
+                yield blank
         
-        # Save to BytesIO object
-        try:
-            excel_buffer = BytesIO()
-            wb.save(excel_buffer)
-            excel_buffer.seek(0)
+        _write_sheet(ws, generic_rows, max_width=80)
+    
+    # Save to the output file
+    try:
+        wb.save(output)
+        
+        # Verify that data was written
+        size = output.tell()
+        if size == 0:
+            raise Exception("No data was written to Excel file")
             
-            # Get the content and verify that data was written
-            content = excel_buffer.getvalue()
-            if len(content) == 0:
-                raise Exception("No data was written to Excel file")
-                
-        except Exception as e:
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate Excel file: {str(e)}"
+        )
+    
+    return size
+
+
+@router.get("/api/export/excel/{file_id}")
+async def export_to_excel(file_id: str, request: Request):
+    """Export parsed data to Excel format"""
+    try:
+        # Validate file_id format
+        if not file_id or len(file_id.strip()) == 0:
+            raise HTTPException(status_code=400, detail="Invalid file ID provided")
+        
+        # Validate against a summary computed server-side, so rejected and
+        # unchanged exports never transfer the tables array
+        summary = await parsed_collection.aggregate([
+            {"$match": {"_id": file_id}},
+            {"$project": {
+                "saved": 1,
+                "original_filename": 1,
+                "parser": 1,
+                "uploaded_at": 1,
+                "saved_at": 1,
+                "last_modified": 1,
+                "table_count": {"$size": {"$ifNull": ["$tables", []]}},
+                # Whether any table is a non-empty object
+                "has_data": {"$anyElementTrue": [{"$map": {
+                    "input": {"$ifNull": ["$tables", []]},
+                    "in": {"$and": [
+                        {"$eq": [{"$type": "$$this"}, "object"]},
+                        {"$ne": ["$$this", {}]}
+                    ]}
+                }}]}
+            }}
+        ]).to_list(length=1)
+        doc = summary[0] if summary else None
+        
+        if not doc:
             raise HTTPException(
-                status_code=500,
-                detail=f"Failed to generate Excel file: {str(e)}"
+                status_code=404, 
+                detail=f"Parsed document with ID '{file_id}' not found. Please ensure the document has been processed and saved."
             )
         
+        if not doc.get("saved", False):
+            raise HTTPException(
+                status_code=400, 
+                detail="Document must be saved before exporting. Please save the document first and try again."
+            )
+        
+        # Get document metadata for filename
+        original_filename = doc.get("original_filename", "Unknown.pdf")
+        parser_used = doc.get("parser", "Unknown")
+        
+        if not doc["table_count"]:
+            raise HTTPException(
+                status_code=400, 
+                detail="No parsed data available for export. Please ensure the document has been parsed successfully."
+            )
+        
+        # Validate that tables contain actual data
+        if not doc["has_data"]:
+            raise HTTPException(
+                status_code=400,
+                detail="No valid data found in parsed tables. Please re-parse the document."
+            )
+        
+        # The workbook only changes when the document is re-parsed, edited or re-saved
+        excel_version = _excel_version(doc)
+        cache_headers = {"ETag": f'"xlsx-{excel_version}"', "Cache-Control": "private, no-cache"}
+        if _etag_matches(request, cache_headers["ETag"]):
+            return Response(status_code=304, headers=cache_headers)
+        
         # Generate filename safely
-        try:
-            safe_filename = original_filename.replace('.pdf', '').replace(' ', '_').replace('/', '_').replace('\\', '_')
-            # Remove any potentially problematic characters
-            import re
-            safe_filename = re.sub(r'[<>:"|?*]', '_', safe_filename)
-            excel_filename = f"{safe_filename}_{parser_used}_data.xlsx"
-        except Exception as e:
-            # Fallback filename
-            excel_filename = f"document_{parser_used}_data.xlsx"
+        safe_filename = _UNSAFE_FILENAME_CHARS.sub("_", (original_filename or "document").removesuffix(".pdf"))
+        excel_filename = f"{safe_filename}_{parser_used}_data.xlsx"
+        
+        cached = await parsed_collection.find_one(
+            {"_id": file_id, "excel_cache.version": excel_version},
+            {"excel_cache.content": 1}
+        )
+        if cached:
+            content = bytes(cached["excel_cache"]["content"])
+        else:
+            # Exports too large to cache on the document live in the exports bucket
+            export_name = f"{file_id}_{excel_version}.xlsx"
+            async for stored_export in exports_bucket.find({"filename": export_name}, limit=1):
+                return RedirectResponse(f"/api/export/download/{stored_export._id}", status_code=303)
+            
+            doc = await parsed_collection.find_one({"_id": file_id}, {"excel_cache": 0})
+            if not doc:
+                raise HTTPException(status_code=404, detail=f"Parsed document with ID '{file_id}' not found.")
+            
+            # Build the workbook off the event loop; it stays in memory up to the
+            # cache limit and spills to an anonymous temp file beyond that
+            with tempfile.SpooledTemporaryFile(max_size=EXCEL_CACHE_MAX_BYTES) as excel_file:
+                size = await asyncio.to_thread(_build_xlsx, doc, excel_file)
+                excel_file.seek(0)
+                
+                if size > EXCEL_CACHE_MAX_BYTES:
+                    # Store it once, replacing exports of earlier versions, and send the
+                    # browser to the download endpoint so this worker is freed right away
+                    await DataLifecycleManager.delete_exports(file_id)
+                    export_id = await exports_bucket.upload_from_stream(
+                        export_name,
+                        excel_file,
+                        metadata={"file_id": file_id, "version": excel_version, "download_name": excel_filename}
+                    )
+                    return RedirectResponse(f"/api/export/download/{export_id}", status_code=303)
+                
+                content = excel_file.read()
+            
+            # Keep the result next to the document so repeat exports skip openpyxl;
+            # update_parsed_document drops the field, and re-parsing replaces the doc
+            await parsed_collection.update_one(
+                {"_id": file_id},
+                {"$set": {"excel_cache": {
+                    "version": excel_version,
+                    "content": content,
+                    "generated_at": datetime.utcnow()
+                }}}
+            )
         
         # Return Excel file with comprehensive headers
         try:
@@ -1056,9 +1405,8 @@ async def export_to_excel(file_id: str):
                     "Content-Disposition": f"attachment; filename=\"{excel_filename}\"",
                     "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     "Content-Length": str(len(content)),
-                    "Cache-Control": "no-cache, no-store, must-revalidate",
-                    "Pragma": "no-cache",
-                    "Expires": "0"
+                    **cache_headers,
+                    **IDENTITY_ENCODING
                 }
             )
         except Exception as e:
@@ -1099,3 +1447,33 @@ async def export_to_excel(file_id: str):
                 status_code=500, 
                 detail=f"Failed to export Excel file. Please try again or contact support if the problem persists."
             )
+
+@router.get("/api/export/download/{export_id}")
+async def download_excel_export(export_id: str, request: Request):
+    """Download a stored Excel export"""
+    try:
+        grid_out = await exports_bucket.open_download_stream(ObjectId(export_id))
+    except (InvalidId, NoFile):
+        raise HTTPException(status_code=404, detail="Export not found")
+    
+    # A stored export is never modified; a new document version gets a new one
+    headers = {"ETag": f'"{export_id}"', "Cache-Control": "private, max-age=31536000, immutable"}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    async def iter_chunks():
+        # Yield one GridFS chunk at a time so memory stays constant regardless of export size
+        while chunk := await grid_out.readchunk():
+            yield chunk
+    
+    download_name = (grid_out.metadata or {}).get("download_name", grid_out.filename)
+    return StreamingResponse(
+        iter_chunks(),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={
+            "Content-Disposition": f"attachment; filename=\"{download_name}\"",
+            "Content-Length": str(grid_out.length),
+            **headers,
+            **IDENTITY_ENCODING
+        }
+    )
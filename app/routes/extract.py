@@ -1,19 +1,27 @@
 from fastapi import APIRouter, Form, HTTPException
 from fastapi.responses import StreamingResponse
-from app.extract.extractor import run_extraction_from_content
+from app.extract.pool import submit_extraction, register_log_stream, run_monitored_extraction
 from app.db.mongo import DocumentManager, ExtractionManager, LogManager
 from app.utils.temp_file import safe_temp_file
-from app.utils.memory_monitor import MemoryMonitor, force_cleanup
-import json
+import orjson
 import asyncio
+import logging
 import os
-from queue import Queue
-import threading
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 VALID_MODES = ["digital", "ocr", "auto"]
-MAX_SSE_MESSAGE_SIZE = 32768  # 32KB limit for individual SSE messages
+
+# Local copies of extracted text; created once here rather than on every request
+EXTRACTED_DIR = "data/extracted_pages"
+os.makedirs(EXTRACTED_DIR, exist_ok=True)
+
+# Limit for individual SSE messages. Starlette's GZipMiddleware deliberately leaves
+# text/event-stream uncompressed, so this is only a guard against runaway payloads
+MAX_SSE_MESSAGE_SIZE = 1024 * 1024
+SSE_KEEPALIVE_SECONDS = 15  # Idle time before a keep-alive comment is sent
+LOG_RELAY_TIMEOUT_SECONDS = 10  # Longest wait for the relay to confirm a stream's last log line
 
 def safe_sse_message(message_type, data=None, message=None):
     """Safely create SSE message, ensuring it doesn't exceed size limits"""
@@ -27,24 +35,30 @@ def safe_sse_message(message_type, data=None, message=None):
     else:
         response_data = {'type': message_type, 'data': data}
     
-    json_str = json.dumps(response_data)
+    json_bytes = orjson.dumps(response_data, default=str)
     
     # Check size and truncate if necessary
-    if len(json_str) > MAX_SSE_MESSAGE_SIZE:
+    if len(json_bytes) > MAX_SSE_MESSAGE_SIZE:
         if message_type == 'log' and message:
             # Truncate log messages
             truncated_message = message[:MAX_SSE_MESSAGE_SIZE // 2] + "... [message truncated]"
             response_data = {'type': 'log', 'message': truncated_message}
-            json_str = json.dumps(response_data)
+            json_bytes = orjson.dumps(response_data)
         else:
             # For other types, send error about size
-            response_data = {'type': 'error', 'message': f'Message too large ({len(json_str)} bytes), check server logs'}
-            json_str = json.dumps(response_data)
+            response_data = {'type': 'error', 'message': f'Message too large ({len(json_bytes)} bytes), check server logs'}
+            json_bytes = orjson.dumps(response_data)
     
-    return f"data: {json_str}\n\n"
+    # Already UTF-8 bytes, so StreamingResponse sends it without re-encoding
+    return b"data: " + json_bytes + b"\n\n"
+
+def write_text_file(path: str, text: str):
+    """Write extracted text to a local file; blocking, so run it via asyncio.to_thread"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
 
 @router.post("/extract")
-async def extract_text(file_id: str = Form(...), mode: str = Form(...)):
+async def extract_text(file_id: str = Form(...), mode: str = Form(...), save_to_disk: bool = Form(True)):
     """Extract text from PDF stored in database"""
     if mode not in VALID_MODES:
         raise HTTPException(status_code=400, detail="Invalid extraction mode")
@@ -55,35 +69,38 @@ async def extract_text(file_id: str = Form(...), mode: str = Form(...)):
         raise HTTPException(status_code=404, detail="Original PDF not found in database")
 
     try:
-        # Monitor memory usage during extraction
-        with MemoryMonitor(f"extraction_{mode}_{file_id}"):
-            # Use safe temporary file handling with automatic cleanup
-            with safe_temp_file(suffix='.pdf', prefix=f'extract_{file_id}_', content=pdf_content) as temp_pdf_path:
-                # Run extraction
-                result = run_extraction_from_content(temp_pdf_path, file_id, mode)
-                
-                # Store extracted text in database
-                extraction_record = await ExtractionManager.store_extraction(
+        # Use safe temporary file handling with automatic cleanup
+        with safe_temp_file(suffix='.pdf', prefix=f'extract_{file_id}_', content=pdf_content) as temp_pdf_path:
+            # Run extraction in the shared worker process pool, which also monitors its
+            # memory and cleans up there; PDF parsing and OCR are CPU-bound
+            result = await asyncio.wrap_future(
+                submit_extraction(run_monitored_extraction, temp_pdf_path, file_id, mode)
+            )
+            
+            # Also save extracted text to data directory unless the caller opted out;
+            # the database already holds the text
+            text_file_path = None
+            writes = []
+            if save_to_disk:
+                text_file_path = os.path.join(EXTRACTED_DIR, f"extracted_{mode}_{file_id}.txt")
+                writes.append(asyncio.to_thread(write_text_file, text_file_path, result["extracted_text"]))
+            
+            # Store extracted text in database and log the extraction; the file
+            # and database writes are independent, so they all run concurrently
+            await asyncio.gather(
+                *writes,
+                ExtractionManager.store_extraction(
                     file_id=file_id,
                     mode=mode,
                     extracted_text=result["extracted_text"],
                     num_pages=result["num_pages"],
                     num_chars=result["num_chars"],
                     method=result["method"]
-                )
-                
-                # Also save extracted text to data directory
-                extracted_dir = "data/extracted_pages"
-                os.makedirs(extracted_dir, exist_ok=True)
-                text_file_path = os.path.join(extracted_dir, f"extracted_{mode}_{file_id}.txt")
-                with open(text_file_path, "w", encoding="utf-8") as f:
-                    f.write(result["extracted_text"])
-                
-                # Log the extraction
-                await LogManager.store_log(
+                ),
+                LogManager.store_log(
                     file_id=file_id,
                     process_type="extraction",
-                    log_content=f"Extraction completed successfully using {mode} mode (saved to {text_file_path})",
+                    log_content=f"Extraction completed successfully using {mode} mode" + (f" (saved to {text_file_path})" if text_file_path else ""),
                     metadata={
                         "mode": mode,
                         "method": result["method"],
@@ -92,10 +109,8 @@ async def extract_text(file_id: str = Form(...), mode: str = Form(...)):
                         "text_file_path": text_file_path
                     }
                 )
-            # Temporary file is automatically cleaned up when exiting the context
-        
-        # Force cleanup after extraction
-        force_cleanup()
+            )
+        # Temporary file is automatically cleaned up when exiting the context
 
     except Exception as e:
         # Log the error
@@ -114,11 +129,11 @@ async def extract_text(file_id: str = Form(...), mode: str = Form(...)):
         "chars": result["num_chars"],
         "saved_as": f"extracted_{mode}_{file_id}.txt",  # Keep for API compatibility
         "file_path": text_file_path,
-        "message": "Extraction complete and stored in database and file system"
+        "message": "Extraction complete and stored in database" + (" and file system" if text_file_path else "")
     }
 
 @router.post("/extract/stream")
-async def extract_text_stream(file_id: str = Form(...), mode: str = Form(...)):
+async def extract_text_stream(file_id: str = Form(...), mode: str = Form(...), save_to_disk: bool = Form(True)):
     """Extract text with real-time streaming progress"""
     if mode not in VALID_MODES:
         raise HTTPException(status_code=400, detail="Invalid extraction mode")
@@ -128,102 +143,125 @@ async def extract_text_stream(file_id: str = Form(...), mode: str = Form(...)):
     if not pdf_content:
         raise HTTPException(status_code=404, detail="Original PDF not found in database")
 
-    # Create queues for log messages and results
-    log_queue = Queue()
-    result_queue = Queue()
+    # Queue of ("log", message) events followed by one ("done", task) event; the
+    # stream awaits it without polling
+    loop = asyncio.get_running_loop()
+    event_queue: asyncio.Queue = asyncio.Queue()
     
-    def log_callback(message: str):
-        log_queue.put(message)
+    # Worker log messages are handed to the event loop by the shared relay thread;
+    # None arrives after the last of them once the stream is closed
+    stream_closed = asyncio.Event()
     
-    def run_extraction_thread():
-        try:
-            # Monitor memory usage during streaming extraction
-            with MemoryMonitor(f"extraction_stream_{mode}_{file_id}"):
-                # Use safe temporary file handling with automatic cleanup
-                with safe_temp_file(suffix='.pdf', prefix=f'extract_stream_{file_id}_', content=pdf_content) as temp_pdf_path:
-                    result = run_extraction_from_content(temp_pdf_path, file_id, mode, log_callback=log_callback)
-                    result_queue.put(("success", result))
-                # Temporary file is automatically cleaned up when exiting the context
-            
-            # Force cleanup after extraction
-            force_cleanup()
-                
-        except Exception as e:
-            result_queue.put(("error", str(e)))
-        finally:
-            log_queue.put("__DONE__")
+    def deliver_log(message):
+        if message is None:
+            loop.call_soon_threadsafe(stream_closed.set)
+        else:
+            loop.call_soon_threadsafe(event_queue.put_nowait, ("log", message))
+    
+    stream_logger = await asyncio.to_thread(register_log_stream, deliver_log)
+    
+    async def run_extraction():
+        # Use safe temporary file handling with automatic cleanup
+        with safe_temp_file(suffix='.pdf', prefix=f'extract_stream_{file_id}_', content=pdf_content) as temp_pdf_path:
+            try:
+                # Memory monitoring and cleanup happen in the worker process
+                return await asyncio.wrap_future(
+                    submit_extraction(
+                        run_monitored_extraction, temp_pdf_path, file_id, mode, log_callback=stream_logger
+                    )
+                )
+            finally:
+                # Wait for the relay to deliver the last log line before "done" is
+                # sent, but never hang the stream if the relay has stopped
+                try:
+                    await asyncio.to_thread(stream_logger.close)
+                    await asyncio.wait_for(stream_closed.wait(), LOG_RELAY_TIMEOUT_SECONDS)
+                except Exception as e:
+                    stream_logger.discard()
+                    logger.warning(f"Log relay did not close stream for {file_id}: {str(e) or type(e).__name__}")
+        # Temporary file is automatically cleaned up when exiting the context
     
-    # Start extraction in a separate thread
-    extraction_thread = threading.Thread(target=run_extraction_thread)
-    extraction_thread.start()
+    # Every log message has been relayed by the time run_extraction returns,
+    # so "done" always arrives after the last of them
+    extraction_task = asyncio.create_task(run_extraction())
+    extraction_task.add_done_callback(lambda task: event_queue.put_nowait(("done", task)))
     
     async def event_stream():
         log_messages = []  # Collect logs for database storage
         
         while True:
             try:
-                if not log_queue.empty():
-                    message = log_queue.get_nowait()
-                    if message == "__DONE__":
-                        # Check for final result
-                        if not result_queue.empty():
-                            result_type, result_data = result_queue.get_nowait()
-                            if result_type == "success":
-                                # Store extracted text in database
-                                await ExtractionManager.store_extraction(
-                                    file_id=file_id,
-                                    mode=mode,
-                                    extracted_text=result_data["extracted_text"],
-                                    num_pages=result_data["num_pages"],
-                                    num_chars=result_data["num_chars"],
-                                    method=result_data["method"]
-                                )
-                                
-                                # Also save extracted text to data directory
-                                extracted_dir = "data/extracted_pages"
-                                os.makedirs(extracted_dir, exist_ok=True)
-                                text_file_path = os.path.join(extracted_dir, f"extracted_{mode}_{file_id}.txt")
-                                with open(text_file_path, "w", encoding="utf-8") as f:
-                                    f.write(result_data["extracted_text"])
-                                
-                                # Store all logs in database
-                                await LogManager.store_log(
-                                    file_id=file_id,
-                                    process_type="extraction",
-                                    log_content="\n".join(log_messages),
-                                    metadata={
-                                        "mode": mode,
-                                        "method": result_data["method"],
-                                        "pages": result_data["num_pages"],
-                                        "chars": result_data["num_chars"],
-                                        "streaming": True,
-                                        "text_file_path": text_file_path
-                                    }
-                                )
-                                
-                                # Send success message without the large text content to avoid JSON parsing issues
-                                success_data = {
-                                    "method": result_data["method"],
-                                    "num_pages": result_data["num_pages"],
-                                    "num_chars": result_data["num_chars"],
-                                    "file_path": text_file_path
-                                }
-                                yield safe_sse_message('success', success_data)
-                            else:
-                                # Store error logs
-                                await LogManager.store_log(
-                                    file_id=file_id,
-                                    process_type="extraction",
-                                    log_content=f"Extraction failed: {result_data}",
-                                    metadata={"error": True, "mode": mode, "streaming": True}
-                                )
-                                yield safe_sse_message('error', message=result_data)
-                        break
-                    else:
-                        log_messages.append(message)
-                        yield safe_sse_message('log', message=message)
+                try:
+                    kind, payload = await asyncio.wait_for(event_queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keep idle connections open during long OCR pages
+                    yield b": keep-alive\n\n"
+                    continue
+                
+                if kind == "log":
+                    log_messages.append(payload)
+                    yield safe_sse_message('log', message=payload)
+                    continue
+                
+                try:
+                    result_data = payload.result()
+                    succeeded = True
+                except Exception as e:
+                    result_data = str(e)
+                    succeeded = False
                 
-                await asyncio.sleep(0.1)
+                if succeeded:
+                    # Also save extracted text to data directory unless the caller opted out
+                    text_file_path = None
+                    writes = []
+                    if save_to_disk:
+                        text_file_path = os.path.join(EXTRACTED_DIR, f"extracted_{mode}_{file_id}.txt")
+                        writes.append(asyncio.to_thread(write_text_file, text_file_path, result_data["extracted_text"]))
+                    
+                    # Write the file and store extracted text and all logs concurrently
+                    await asyncio.gather(
+                        *writes,
+                        ExtractionManager.store_extraction(
+                            file_id=file_id,
+                            mode=mode,
+                            extracted_text=result_data["extracted_text"],
+                            num_pages=result_data["num_pages"],
+                            num_chars=result_data["num_chars"],
+                            method=result_data["method"]
+                        ),
+                        LogManager.store_log(
+                            file_id=file_id,
+                            process_type="extraction",
+                            log_content="\n".join(log_messages),
+                            metadata={
+                                "mode": mode,
+                                "method": result_data["method"],
+                                "pages": result_data["num_pages"],
+                                "chars": result_data["num_chars"],
+                                "streaming": True,
+                                "text_file_path": text_file_path
+                            }
+                        )
+                    )
+                    
+                    # Send success message without the large text content to avoid JSON parsing issues
+                    success_data = {
+                        "method": result_data["method"],
+                        "num_pages": result_data["num_pages"],
+                        "num_chars": result_data["num_chars"],
+                        "file_path": text_file_path
+                    }
+                    yield safe_sse_message('success', success_data)
+                else:
+                    # Store error logs
+                    await LogManager.store_log(
+                        file_id=file_id,
+                        process_type="extraction",
+                        log_content=f"Extraction failed: {result_data}",
+                        metadata={"error": True, "mode": mode, "streaming": True}
+                    )
+                    yield safe_sse_message('error', message=result_data)
+                break
                 
             except Exception as e:
                 yield safe_sse_message('error', message=str(e))
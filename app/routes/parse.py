@@ -1,13 +1,26 @@
 from fastapi import APIRouter, Form, HTTPException
 from app.parsers.parser_registry import parser_registry
 from app.db.mongo import parsed_collection, DocumentManager, ExtractionManager, LogManager
+from app.utils.document_cache import invalidate_document_caches
 from app.utils.temp_file import safe_temp_file
+from app.utils.orjson_response import ORJSON_OPTIONS
 from datetime import datetime
-import json
+from app.config import config
+import asyncio
+import orjson
 import os
 
 router = APIRouter()
 
+# Local copies of parsed output; created once here rather than on every request
+PARSED_DIR = "data/parsed_output"
+os.makedirs(PARSED_DIR, exist_ok=True)
+
+def write_json_file(path: str, data: dict):
+    """Serialize parsed output and write it to a local file; blocking, so run it via asyncio.to_thread"""
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(data, default=str, option=ORJSON_OPTIONS | orjson.OPT_INDENT_2))
+
 @router.post("/parse")
 async def parse_text(
     file_id: str = Form(...), 
@@ -70,25 +83,32 @@ async def parse_text(
             "parser": parser,
             "original_filename": original_filename,
             "tables": parsed_output,
-            "uploaded_at": datetime.utcnow().isoformat(),
+            "uploaded_at": datetime.utcnow(),
             "extraction_mode_used": used_mode,
             "num_entries": len(parsed_output),
             "processing_completed": True,
             "saved": False  # Requires manual approval via Save button
         }
         
-        await parsed_collection.replace_one(
-            {"_id": file_id},
-            parsed_data,
-            upsert=True
+        # Also save parsed output to data directory unless disabled; the file and
+        # database writes are independent, so they run concurrently
+        json_file_path = None
+        writes = []
+        if config.WRITE_LOCAL_JSON:
+            json_file_path = os.path.join(PARSED_DIR, f"parsed_{file_id}.json")
+            writes.append(asyncio.to_thread(write_json_file, json_file_path, parsed_data))
+        
+        await asyncio.gather(
+            *writes,
+            parsed_collection.replace_one(
+                {"_id": file_id},
+                parsed_data,
+                upsert=True
+            )
         )
-
-        # Also save parsed output to data directory
-        parsed_dir = "data/parsed_output"
-        os.makedirs(parsed_dir, exist_ok=True)
-        json_file_path = os.path.join(parsed_dir, f"parsed_{file_id}.json")
-        with open(json_file_path, "w", encoding="utf-8") as f:
-            json.dump(parsed_data, f, indent=2, ensure_ascii=False, default=str)
+        # The replaced document is unsaved and has no Unite status any more, so
+        # cached list pages and status must not outlive it
+        invalidate_document_caches(file_id)
 
         # Update document processing stage
         await DocumentManager.update_processing_stage(file_id, "parsed", True)
@@ -114,7 +134,7 @@ async def parse_text(
         await LogManager.store_log(
             file_id=file_id,
             process_type="parsing",
-            log_content=f"Parsing completed successfully using {parser} with {'image analysis + ' if parser == 'AIParser' else ''}text processing (saved to {json_file_path})",
+            log_content=f"Parsing completed successfully using {parser} with {'image analysis + ' if parser == 'AIParser' else ''}text processing" + (f" (saved to {json_file_path})" if json_file_path else ""),
             metadata=log_metadata
         )
 
@@ -123,7 +143,7 @@ async def parse_text(
             "parser_used": parser,
             "extraction_mode_used": used_mode,
             "num_entries": len(parsed_output),
-            "message": "Parsing complete and stored in database and file system",
+            "message": "Parsing complete and stored in database" + (" and file system" if json_file_path else ""),
             "saved_as": f"parsed_{file_id}.json",  # Keep for API compatibility
             "file_path": json_file_path
         }
@@ -1,13 +1,43 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from starlette.formparsers import MultiPartParser
 from uuid import uuid4
+from typing import BinaryIO
+import asyncio
+import mmap
 import os
-import tempfile
-import pdfplumber
+import shutil
+from app.config import config
 from app.db.mongo import DocumentManager, LogManager
+from app.utils.pdf_pages import count_pages, pdf_executor
 from app.utils.memory_monitor import MemoryMonitor, force_cleanup
 
 router = APIRouter()
 
+# Local copies of uploaded PDFs; created once here rather than on every request
+UPLOADED_DIR = "data/uploaded_pdfs"
+os.makedirs(UPLOADED_DIR, exist_ok=True)
+
+def save_upload(source: BinaryIO, path: str):
+    """Copy an uploaded file to a local path in chunks; blocking, so run it via asyncio.to_thread"""
+    source.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(source, f, 1024 * 1024)
+
+def count_upload_pages(source: BinaryIO, size: int) -> int:
+    """
+    Count the pages of a spooled upload without copying large uploads into memory.
+
+    source must be positioned at the start. PyMuPDF only reads the page tree, but
+    it is not thread-safe, so run this on pdf_executor.
+    """
+    if size <= MultiPartParser.spool_max_size:
+        # Still held in memory by Starlette; a copy of at most the spool size is cheap,
+        # and fileno() would force it onto disk
+        return count_pages(source.read())
+    # Rolled over to a temporary file on disk: map it instead of reading it
+    with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+        return count_pages(view)
+
 @router.post("/upload")
 async def upload_pdf(file: UploadFile = File(...)):
     """Upload PDF file and store in database via GridFS with immediate page counting"""
@@ -28,12 +58,13 @@ async def upload_pdf(file: UploadFile = File(...)):
     try:
         # Monitor memory usage during upload
         with MemoryMonitor(f"upload_{file_id}"):
-            print(f"🔵 Reading file content...")
-            # Read file content
-            file_content = await file.read()
-            print(f"🔵 File content read successfully, size: {len(file_content)} bytes")
+            # Starlette has already spooled the upload (in memory while small, on disk
+            # beyond that), so it is checked and copied from there in chunks rather
+            # than read into memory in full
+            file_size = file.size
+            print(f"🔵 File received, size: {file_size} bytes")
             
-            if len(file_content) == 0:
+            if file_size == 0:
                 error_detail = {
                     "error_code": "EMPTY_FILE_UPLOADED",
                     "message": "The uploaded file is empty."
@@ -41,12 +72,12 @@ async def upload_pdf(file: UploadFile = File(...)):
                 print(f"❌ {error_detail['message']}")
                 raise HTTPException(status_code=400, detail=error_detail)
             
-            # Validate file size (50MB limit)
-            max_size_bytes = 50 * 1024 * 1024  # 50MB
-            if len(file_content) > max_size_bytes:
+            # Validate file size
+            max_size_bytes = config.MAX_FILE_SIZE_MB * 1024 * 1024
+            if file_size > max_size_bytes:
                 error_detail = {
                     "error_code": "FILE_TOO_LARGE",
-                    "message": f"File too large. Maximum size is 50MB. File size: {len(file_content) / 1024 / 1024:.1f}MB"
+                    "message": f"File too large. Maximum size is {config.MAX_FILE_SIZE_MB}MB. File size: {file_size / 1024 / 1024:.1f}MB"
                 }
                 print(f"❌ {error_detail['message']}")
                 raise HTTPException(status_code=413, detail=error_detail)
@@ -55,20 +86,11 @@ async def upload_pdf(file: UploadFile = File(...)):
             print(f"🔵 Counting PDF pages...")
             page_count = 0
             try:
-                with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-                    temp_file.write(file_content)
-                    temp_pdf_path = temp_file.name
-                
-                try:
-                    with pdfplumber.open(temp_pdf_path) as pdf:
-                        page_count = len(pdf.pages)
-                        print(f"✅ PDF contains {page_count} pages")
-                finally:
-                    # Clean up temp file
-                    try:
-                        os.unlink(temp_pdf_path)
-                    except:
-                        pass
+                # Off the event loop, without parsing every page as pdfplumber did
+                loop = asyncio.get_running_loop()
+                await file.seek(0)
+                page_count = await loop.run_in_executor(pdf_executor, count_upload_pages, file.file, file_size)
+                print(f"✅ PDF contains {page_count} pages")
                         
             except Exception as e:
                 print(f"⚠️ Could not count pages immediately: {e}")
@@ -79,18 +101,16 @@ async def upload_pdf(file: UploadFile = File(...)):
             result = await DocumentManager.create_document(
                 file_id=file_id,
                 original_filename=file.filename,
-                file_content=file_content,
+                file_stream=file.file,
+                file_size=file_size,
                 additional_metadata={"page_count": page_count}
             )
             print(f"✅ Database storage completed successfully")
             
             print(f"🔵 Saving to local directory...")
             # Also save to data directory
-            uploaded_dir = "data/uploaded_pdfs"
-            os.makedirs(uploaded_dir, exist_ok=True)
-            file_path = os.path.join(uploaded_dir, f"original_{file_id}.pdf")
-            with open(file_path, "wb") as f:
-                f.write(file_content)
+            file_path = os.path.join(UPLOADED_DIR, f"original_{file_id}.pdf")
+            await asyncio.to_thread(save_upload, file.file, file_path)
             print(f"✅ Local file saved: {file_path}")
             
             print(f"🔵 Storing upload log...")
@@ -100,7 +120,7 @@ async def upload_pdf(file: UploadFile = File(...)):
                 process_type="upload",
                 log_content=f"PDF uploaded successfully: {file.filename} (saved to {file_path}) - {page_count} pages detected",
                 metadata={
-                    "file_size": len(file_content),
+                    "file_size": file_size,
                     "content_type": file.content_type,
                     "file_path": file_path,
                     "page_count": page_count
@@ -119,11 +139,14 @@ async def upload_pdf(file: UploadFile = File(...)):
             "original_filename": file.filename,
             "saved_as": f"original_{file_id}.pdf",  # Keep for API compatibility
             "file_path": file_path,
-            "file_size": len(file_content),
+            "file_size": file_size,
             "page_count": page_count,
             "status": "uploaded"
         }
         
+    except HTTPException:
+        # Validation errors (empty or oversized file) keep their own status code
+        raise
     except Exception as e:
         print(f"❌ Upload failed for file_id {file_id}: {str(e)}")
         import traceback
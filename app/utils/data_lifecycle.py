@@ -1,4 +1,6 @@
+import asyncio
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from app.db.mongo import (
@@ -6,11 +8,24 @@ from app.db.mongo import (
     extractions_collection, 
     parsed_collection, 
     processing_logs_collection, 
-    gridfs_bucket
+    gridfs_bucket,
+    previews_bucket,
+    exports_bucket,
+    texts_bucket,
+    LogManager
 )
 
 logger = logging.getLogger(__name__)
 
+# Local copies written alongside the database records for each document
+LOCAL_FILE_TEMPLATES = [
+    "data/uploaded_pdfs/original_{file_id}.pdf",
+    "data/extracted_pages/extracted_digital_{file_id}.txt",
+    "data/extracted_pages/extracted_ocr_{file_id}.txt",
+    "data/extracted_pages/extracted_auto_{file_id}.txt",
+    "data/parsed_output/parsed_{file_id}.json",
+]
+
 class DataLifecycleManager:
     """
     Manages the complete lifecycle of document data including:
@@ -36,13 +51,16 @@ class DataLifecycleManager:
         # Find documents that are uploaded, possibly extracted, but not parsed
         orphaned_docs = []
         
-        async for doc in documents_collection.find({
-            "uploaded_at": {"$lt": cutoff_time},
-            "processing_stages.uploaded": True,
-            "processing_stages.parsed": False
-        }):
+        async for doc in documents_collection.find(
+            {
+                "uploaded_at": {"$lt": cutoff_time},
+                "processing_stages.uploaded": True,
+                "processing_stages.parsed": False
+            },
+            {"original_filename": 1, "uploaded_at": 1, "processing_stages": 1, "file_size": 1}
+        ):
             # Check if this document exists in parsed_collection
-            parsed_doc = await parsed_collection.find_one({"_id": doc["_id"]})
+            parsed_doc = await parsed_collection.find_one({"_id": doc["_id"]}, {"_id": 1})
             if not parsed_doc:
                 orphaned_docs.append({
                     "file_id": doc["_id"],
@@ -76,28 +94,33 @@ class DataLifecycleManager:
         
         try:
             # 1. Check if document is actually orphaned (safety check)
-            parsed_doc = await parsed_collection.find_one({"_id": file_id})
+            parsed_doc = await parsed_collection.find_one({"_id": file_id}, {"_id": 1})
             if parsed_doc:
                 cleanup_results["warnings"].append("Document is not orphaned - has parsed data")
                 return cleanup_results
             
             # 2. Get document metadata first
-            doc_metadata = await documents_collection.find_one({"_id": file_id})
+            doc_metadata = await documents_collection.find_one({"_id": file_id}, {"gridfs_file_id": 1})
             if not doc_metadata:
                 cleanup_results["warnings"].append("Document metadata not found")
                 return cleanup_results
             
-            # 3. Delete extractions
+            # 3. Delete extractions and their text
             extraction_result = await extractions_collection.delete_many({"file_id": file_id})
             if extraction_result.deleted_count > 0:
                 cleanup_results["deleted_items"].append(f"extractions ({extraction_result.deleted_count})")
             
-            # 4. Delete processing logs
+            texts_deleted = await DataLifecycleManager.delete_extracted_texts(file_id)
+            if texts_deleted > 0:
+                cleanup_results["deleted_items"].append(f"extracted_texts ({texts_deleted})")
+            
+            # 4. Delete processing logs, once any still queued for writing have landed
+            await LogManager.flush(file_id)
             logs_result = await processing_logs_collection.delete_many({"file_id": file_id})
             if logs_result.deleted_count > 0:
                 cleanup_results["deleted_items"].append(f"logs ({logs_result.deleted_count})")
             
-            # 5. Delete PDF from GridFS
+            # 5. Delete PDF and cached page previews from GridFS
             if "gridfs_file_id" in doc_metadata:
                 try:
                     await gridfs_bucket.delete(doc_metadata["gridfs_file_id"])
@@ -105,6 +128,10 @@ class DataLifecycleManager:
                 except Exception as e:
                     cleanup_results["errors"].append(f"Failed to delete GridFS file: {str(e)}")
             
+            previews_deleted = await DataLifecycleManager.delete_page_previews(file_id)
+            if previews_deleted > 0:
+                cleanup_results["deleted_items"].append(f"page_previews ({previews_deleted})")
+            
             # 6. Delete document metadata (last step)
             doc_result = await documents_collection.delete_one({"_id": file_id})
             if doc_result.deleted_count > 0:
@@ -182,9 +209,9 @@ class DataLifecycleManager:
         }
         
         try:
-            # 1. Pre-deletion validation
-            doc_metadata = await documents_collection.find_one({"_id": file_id})
-            parsed_doc = await parsed_collection.find_one({"_id": file_id})
+            # 1. Pre-deletion validation - only existence and the GridFS id are needed
+            doc_metadata = await documents_collection.find_one({"_id": file_id}, {"gridfs_file_id": 1})
+            parsed_doc = await parsed_collection.find_one({"_id": file_id}, {"_id": 1})
             
             deletion_results["validation"] = {
                 "has_metadata": doc_metadata is not None,
@@ -201,17 +228,22 @@ class DataLifecycleManager:
             if result.deleted_count > 0:
                 deletion_results["deleted_items"].append("parsed_document")
             
-            # 3. Delete from extractions collection (all modes)
+            # 3. Delete from extractions collection (all modes) and their text
             extraction_result = await extractions_collection.delete_many({"file_id": file_id})
             if extraction_result.deleted_count > 0:
                 deletion_results["deleted_items"].append(f"extractions ({extraction_result.deleted_count})")
             
-            # 4. Delete processing logs
+            texts_deleted = await DataLifecycleManager.delete_extracted_texts(file_id)
+            if texts_deleted > 0:
+                deletion_results["deleted_items"].append(f"extracted_texts ({texts_deleted})")
+            
+            # 4. Delete processing logs, once any still queued for writing have landed
+            await LogManager.flush(file_id)
             logs_result = await processing_logs_collection.delete_many({"file_id": file_id})
             if logs_result.deleted_count > 0:
                 deletion_results["deleted_items"].append(f"logs ({logs_result.deleted_count})")
             
-            # 5. Delete PDF from GridFS
+            # 5. Delete PDF and cached page previews from GridFS
             if doc_metadata and "gridfs_file_id" in doc_metadata:
                 try:
                     await gridfs_bucket.delete(doc_metadata["gridfs_file_id"])
@@ -219,18 +251,31 @@ class DataLifecycleManager:
                 except Exception as e:
                     deletion_results["errors"].append(f"Failed to delete GridFS file: {str(e)}")
             
+            previews_deleted = await DataLifecycleManager.delete_page_previews(file_id)
+            if previews_deleted > 0:
+                deletion_results["deleted_items"].append(f"page_previews ({previews_deleted})")
+            
+            exports_deleted = await DataLifecycleManager.delete_exports(file_id)
+            if exports_deleted > 0:
+                deletion_results["deleted_items"].append(f"excel_exports ({exports_deleted})")
+            
             # 6. Delete document metadata (last step)
             if doc_metadata:
                 doc_result = await documents_collection.delete_one({"_id": file_id})
                 if doc_result.deleted_count > 0:
                     deletion_results["deleted_items"].append("document_metadata")
             
-            # 7. Post-deletion verification
+            # 7. Delete local copies once the database records are gone
+            local_files_deleted = await DataLifecycleManager.delete_local_files(file_id)
+            if local_files_deleted:
+                deletion_results["deleted_items"].append(f"local_files ({len(local_files_deleted)})")
+            
+            # 8. Post-deletion verification
             remaining_data = await DataLifecycleManager.verify_complete_deletion(file_id)
             if remaining_data["has_remaining_data"]:
                 deletion_results["warnings"].append(f"Some data may remain: {remaining_data}")
             
-            # 8. Log the deletion
+            # 9. Log the deletion
             logger.info(f"Enhanced deletion of {file_id}: {deletion_results['deleted_items']}")
             
         except Exception as e:
@@ -239,6 +284,86 @@ class DataLifecycleManager:
         
         return deletion_results
     
+    @staticmethod
+    async def delete_page_previews(file_id: str) -> int:
+        """
+        Delete all cached page preview images rendered for a document.
+        
+        Args:
+            file_id: ID of the document whose previews should be removed
+            
+        Returns:
+            Number of preview images deleted
+        """
+        deleted = 0
+        async for preview in previews_bucket.find({"metadata.file_id": file_id}):
+            await previews_bucket.delete(preview._id)
+            deleted += 1
+        return deleted
+    
+    @staticmethod
+    async def delete_extracted_texts(file_id: str) -> int:
+        """
+        Delete all extracted text stored in GridFS for a document.
+        
+        Args:
+            file_id: ID of the document whose extracted text should be removed
+            
+        Returns:
+            Number of text files deleted
+        """
+        deleted = 0
+        async for text_file in texts_bucket.find({"metadata.file_id": file_id}):
+            await texts_bucket.delete(text_file._id)
+            deleted += 1
+        return deleted
+    
+    @staticmethod
+    async def delete_exports(file_id: str) -> int:
+        """
+        Delete all stored Excel exports generated for a document.
+        
+        Args:
+            file_id: ID of the document whose exports should be removed
+            
+        Returns:
+            Number of exports deleted
+        """
+        deleted = 0
+        async for export in exports_bucket.find({"metadata.file_id": file_id}):
+            await exports_bucket.delete(export._id)
+            deleted += 1
+        return deleted
+    
+    @staticmethod
+    async def delete_local_files(file_id: str) -> List[str]:
+        """
+        Remove the local copies of a document's upload, extractions and parsed output.
+        
+        The removals are independent, so they run concurrently in worker threads
+        rather than blocking the event loop one after another.
+        
+        Args:
+            file_id: ID of the document whose files should be removed
+            
+        Returns:
+            Paths of the files that were removed
+        """
+        async def remove(path: str) -> Optional[str]:
+            try:
+                await asyncio.to_thread(os.unlink, path)
+                return path
+            except FileNotFoundError:
+                return None
+            except OSError as e:
+                logger.warning(f"Failed to delete local file {path}: {e}")
+                return None
+        
+        removed = await asyncio.gather(
+            *(remove(template.format(file_id=file_id)) for template in LOCAL_FILE_TEMPLATES)
+        )
+        return [path for path in removed if path]
+    
     @staticmethod
     async def verify_complete_deletion(file_id: str) -> Dict[str, Any]:
         """
@@ -258,10 +383,10 @@ class DataLifecycleManager:
         
         # Check each collection
         checks = [
-            ("documents", await documents_collection.find_one({"_id": file_id})),
-            ("parsed", await parsed_collection.find_one({"_id": file_id})),
-            ("extractions", await extractions_collection.find_one({"file_id": file_id})),
-            ("logs", await processing_logs_collection.find_one({"file_id": file_id}))
+            ("documents", await documents_collection.find_one({"_id": file_id}, {"_id": 1})),
+            ("parsed", await parsed_collection.find_one({"_id": file_id}, {"_id": 1})),
+            ("extractions", await extractions_collection.find_one({"file_id": file_id}, {"_id": 1})),
+            ("logs", await processing_logs_collection.find_one({"file_id": file_id}, {"_id": 1}))
         ]
         
         for collection_name, data in checks:
@@ -279,46 +404,69 @@ class DataLifecycleManager:
         Returns:
             Dictionary with lifecycle statistics
         """
-        stats = {}
-        
-        # Basic counts
-        stats["total_documents"] = await documents_collection.count_documents({})
-        stats["total_extractions"] = await extractions_collection.count_documents({})
-        stats["total_parsed"] = await parsed_collection.count_documents({})
-        stats["total_logs"] = await processing_logs_collection.count_documents({})
-        
-        # Processing stage analysis
-        stats["uploaded_only"] = await documents_collection.count_documents({
-            "processing_stages.uploaded": True,
-            "processing_stages.extracted": False,
-            "processing_stages.parsed": False
-        })
-        
-        stats["extracted_not_parsed"] = await documents_collection.count_documents({
-            "processing_stages.uploaded": True,
-            "processing_stages.extracted": True,
-            "processing_stages.parsed": False
-        })
-        
-        stats["fully_processed"] = await documents_collection.count_documents({
-            "processing_stages.uploaded": True,
-            "processing_stages.extracted": True,
-            "processing_stages.parsed": True
-        })
-        
-        # Orphaned data (older than 7 days instead of 24 hours)
-        orphaned_docs = await DataLifecycleManager.find_orphaned_documents(168)  # Changed from 24 to 168 hours
-        stats["orphaned_documents"] = len(orphaned_docs)
-        
-        # Age analysis
         cutoff_1h = datetime.utcnow() - timedelta(hours=1)
         cutoff_24h = datetime.utcnow() - timedelta(hours=24)
         cutoff_7d = datetime.utcnow() - timedelta(days=7)
         
-        stats["recent_uploads"] = {
-            "last_hour": await documents_collection.count_documents({"uploaded_at": {"$gte": cutoff_1h}}),
-            "last_24_hours": await documents_collection.count_documents({"uploaded_at": {"$gte": cutoff_24h}}),
-            "last_7_days": await documents_collection.count_documents({"uploaded_at": {"$gte": cutoff_7d}})
+        def stage_match(extracted: bool, parsed: bool) -> Dict[str, Any]:
+            return {"$match": {
+                "processing_stages.uploaded": True,
+                "processing_stages.extracted": extracted,
+                "processing_stages.parsed": parsed
+            }}
+        
+        def count_since(cutoff: datetime) -> List[Dict[str, Any]]:
+            return [{"$match": {"uploaded_at": {"$gte": cutoff}}}, {"$count": "n"}]
+        
+        # Every documents-collection counter is a $facet branch of one aggregation,
+        # and the per-collection totals and orphan scan run alongside it
+        (
+            document_facets,
+            total_extractions,
+            total_parsed,
+            total_logs,
+            orphaned_docs  # Orphaned data (older than 7 days instead of 24 hours)
+        ) = await asyncio.gather(
+            documents_collection.aggregate([
+                {"$facet": {
+                    "total": [{"$count": "n"}],
+                    "uploaded_only": [stage_match(False, False), {"$count": "n"}],
+                    "extracted_not_parsed": [stage_match(True, False), {"$count": "n"}],
+                    "fully_processed": [stage_match(True, True), {"$count": "n"}],
+                    "last_hour": count_since(cutoff_1h),
+                    "last_24_hours": count_since(cutoff_24h),
+                    "last_7_days": count_since(cutoff_7d)
+                }}
+            ]).to_list(length=1),
+            extractions_collection.count_documents({}),
+            parsed_collection.count_documents({}),
+            processing_logs_collection.count_documents({}),
+            DataLifecycleManager.find_orphaned_documents(168)  # Changed from 24 to 168 hours
+        )
+        
+        facets = document_facets[0] if document_facets else {}
+        
+        def facet_count(name: str) -> int:
+            bucket = facets.get(name) or []
+            return bucket[0]["n"] if bucket else 0
+        
+        stats = {
+            # Basic counts
+            "total_documents": facet_count("total"),
+            "total_extractions": total_extractions,
+            "total_parsed": total_parsed,
+            "total_logs": total_logs,
+            # Processing stage analysis
+            "uploaded_only": facet_count("uploaded_only"),
+            "extracted_not_parsed": facet_count("extracted_not_parsed"),
+            "fully_processed": facet_count("fully_processed"),
+            "orphaned_documents": len(orphaned_docs),
+            # Age analysis
+            "recent_uploads": {
+                "last_hour": facet_count("last_hour"),
+                "last_24_hours": facet_count("last_24_hours"),
+                "last_7_days": facet_count("last_7_days")
+            }
         }
         
         return stats 
\ No newline at end of file
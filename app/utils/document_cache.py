@@ -0,0 +1,15 @@
+from cachetools import TTLCache
+
+# Rendered /api/list bodies and their ETags, keyed by page; cleared whenever a
+# listed document changes
+list_cache = TTLCache(maxsize=16, ttl=10)
+
+# Unite status payloads by file_id; absorbs frontend polling while an upload runs.
+# The upload bot may write the status directly, so entries are kept very short-lived
+unite_status_cache = TTLCache(maxsize=1024, ttl=1)
+
+def invalidate_document_caches(*file_ids: str):
+    """Drop cached responses that may include the given documents; call after changing them"""
+    list_cache.clear()
+    for file_id in file_ids:
+        unite_status_cache.pop(file_id, None)
@@ -0,0 +1,27 @@
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+# Options shared by every orjson-encoded API payload
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_SERIALIZE_NUMPY
+    | orjson.OPT_NAIVE_UTC
+    | orjson.OPT_UTC_Z
+)
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson.
+
+    orjson encodes datetimes and numpy values natively in a single C-level pass;
+    anything else it does not understand (e.g. Mongo ObjectIds) falls back to str().
+    Naive datetimes read back from Mongo are UTC and are emitted with a trailing "Z".
+
+    Routes that return datetimes must return this class explicitly: a plain dict
+    return is run through FastAPI's jsonable_encoder first, which turns datetimes
+    into strings without the "Z" before render() ever sees them.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=str, option=ORJSON_OPTIONS)
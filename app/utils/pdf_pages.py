@@ -0,0 +1,59 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union
+import pymupdf
+
+logger = logging.getLogger(__name__)
+
+# PyMuPDF is not thread-safe, so callers that need to keep the event loop free
+# should run these helpers on this single dedicated worker thread
+pdf_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pymupdf")
+
+def count_pages(pdf_content: Union[bytes, memoryview]) -> int:
+    """
+    Count the pages of a PDF held in memory.
+
+    Only the document's page tree is read; nothing is rendered. A memoryview is
+    read in place, so buffers and mapped files can be counted without a copy.
+
+    Args:
+        pdf_content: Raw PDF bytes, or a memoryview over them
+
+    Returns:
+        int: Number of pages in the document
+    """
+    with pymupdf.open(stream=pdf_content, filetype="pdf") as pdf:
+        return pdf.page_count
+
+def count_pages_in_file(pdf_path: str) -> int:
+    """
+    Count the pages of a PDF on disk without reading it into memory.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        int: Number of pages in the document
+    """
+    with pymupdf.open(pdf_path, filetype="pdf") as pdf:
+        return pdf.page_count
+
+def render_page_png(pdf_content: bytes, page_num: int, dpi: int) -> Optional[bytes]:
+    """
+    Render a single page of a PDF held in memory to PNG.
+
+    Args:
+        pdf_content: Raw PDF bytes
+        page_num: 1-indexed page number to render
+        dpi: Output resolution
+
+    Returns:
+        bytes: PNG image data, or None if the page does not exist
+    """
+    with pymupdf.open(stream=pdf_content, filetype="pdf") as pdf:
+        if page_num < 1 or page_num > pdf.page_count:
+            return None
+
+        pixmap = pdf.load_page(page_num - 1).get_pixmap(dpi=dpi, alpha=False)
+        logger.debug(f"Rendered page {page_num} at {dpi} DPI ({pixmap.width}x{pixmap.height})")
+        return pixmap.tobytes("png")
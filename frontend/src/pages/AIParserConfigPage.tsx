@@ -116,9 +116,8 @@ export default function AIParserConfigPage() {
       setPagePreview(null); // Clear previous preview immediately
       
       try {
-        // Add timestamp to prevent caching
-        const url = `${API_ENDPOINTS.pagePreview(fileId, pageNum)}?t=${Date.now()}`;
-        const response = await fetch(url);
+        // Previews are immutable PNGs, so let the browser cache serve repeat requests
+        const response = await fetch(API_ENDPOINTS.pagePreview(fileId, pageNum));
         
         if (!response.ok) {
           const errorText = await response.text();
@@ -126,11 +125,11 @@ export default function AIParserConfigPage() {
           throw new Error(`Failed to fetch page preview: ${response.status}`);
         }
         
-        const data = await response.json();
+        const image = await response.blob();
         console.log(`Successfully fetched preview for page ${pageNum}`);
         
-        if (data.success && data.image) {
-          setPagePreview(data.image);
+        if (image.type === "image/png") {
+          setPagePreview(URL.createObjectURL(image));
         } else {
           throw new Error("Invalid preview data received");
         }
@@ -149,6 +148,15 @@ export default function AIParserConfigPage() {
     return () => clearTimeout(timeoutId);
   }, [fileId, pageNum, totalPages, needsExtraction]);
 
+  // Release the previous preview's object URL once it is replaced
+  useEffect(() => {
+    return () => {
+      if (pagePreview) {
+        URL.revokeObjectURL(pagePreview);
+      }
+    };
+  }, [pagePreview]);
+
   const handlePageChange = (newPageNum: number) => {
     if (newPageNum >= 1 && newPageNum <= (totalPages || 1)) {
       console.log(`Page changed: ${pageNum} -> ${newPageNum}`);
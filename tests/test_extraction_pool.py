@@ -0,0 +1,61 @@
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pymupdf
+import pytest
+
+from app.extract import pool
+
+
+@pytest.fixture
+def single_worker_pool(monkeypatch):
+    monkeypatch.setattr(pool.config, "EXTRACTION_WORKERS", 1)
+    pool.shutdown_extraction_pool()
+    yield
+    pool.shutdown_extraction_pool()
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    path = tmp_path / "sample.pdf"
+    with pymupdf.open() as doc:
+        doc.new_page().insert_text((72, 72), "Pool recovery check")
+        doc.save(path)
+    return str(path)
+
+
+def test_extraction_recovers_after_worker_dies(single_worker_pool, sample_pdf):
+    # A worker exiting abruptly (as when it is OOM-killed) breaks the whole pool
+    with pytest.raises(BrokenProcessPool):
+        pool.submit_extraction(os._exit, 1).result(timeout=60)
+
+    result = pool.submit_extraction(
+        pool.run_monitored_extraction, sample_pdf, "file_id", "digital"
+    ).result(timeout=120)
+
+    assert result["num_pages"] == 1
+    assert "Pool recovery check" in result["extracted_text"]
+
+
+def test_log_relay_survives_a_failing_stream(single_worker_pool):
+    def fail(message):
+        raise RuntimeError("client went away")
+
+    received = []
+    closed = threading.Event()
+
+    def deliver(message):
+        if message is None:
+            closed.set()
+        else:
+            received.append(message)
+
+    broken = pool.register_log_stream(fail)
+    healthy = pool.register_log_stream(deliver)
+    broken("first")
+    healthy("second")
+    healthy.close()
+
+    assert closed.wait(timeout=10)
+    assert received == ["second"]